@@ -15,6 +15,7 @@
 
 import json
 import time
+from collections import deque
 from abc import ABC, abstractmethod
 from typing import Dict, Any, List, Optional, Callable
 from datetime import datetime
@@ -111,7 +112,7 @@ class BaseAgent(ABC):
         self.agent_id = agent_id
         self.role = role
         self.capabilities = capabilities
-        self.message_queue: List[Message] = []
+        self.message_queue: deque = deque()
         self.knowledge_base: Dict[str, Any] = {}
         self.is_active = True
         self.collaboration_network: Dict[str, 'BaseAgent'] = {}
@@ -142,7 +143,7 @@ class BaseAgent(ABC):
         """Process all queued messages"""
         responses = []
         while self.message_queue:
-            message = self.message_queue.pop(0)
+            message = self.message_queue.popleft()
             response = self.process_message(message)
             if response:
                 responses.append(response)
@@ -182,11 +183,13 @@ class AgentCommunicationHub:
         
     def connect_all_agents(self):
         """Connect all agents to each other"""
-        agent_list = list(self.agents.values())
-        for i, agent1 in enumerate(agent_list):
-            for j, agent2 in enumerate(agent_list):
-                if i != j:
-                    agent1.connect_agent(agent2)
+        # Fully connected network: each agent's peers are every other registered
+        # agent, so build each network in one pass instead of N*(N-1) pairwise
+        # connect_agent() calls (each of which also writes the reverse edge).
+        for agent_id, agent in self.agents.items():
+            agent.collaboration_network.update(
+                (peer_id, peer) for peer_id, peer in self.agents.items() if peer_id != agent_id
+            )
     
     def broadcast_message(self, sender_id: str, content: Dict[str, Any]) -> List[Message]:
         """Broadcast message from one agent to all others"""
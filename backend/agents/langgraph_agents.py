@@ -17,21 +17,37 @@ LangGraph旅行规划智能体系统
 - 智能体通过共享状态进行通信和协作
 """
 
-from typing import Dict, Any, List, Optional, TypedDict, Annotated
+from typing import Dict, Any, List, Optional, TypedDict, Annotated, Callable
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langgraph.graph import StateGraph, END
 from langgraph.graph.message import add_messages
 import json
+import threading
 from datetime import datetime
 
 import sys
 import os
-# 添加backend目录到Python路径
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# 添加backend目录到Python路径（已存在时不再重复添加）
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _BACKEND_DIR not in sys.path:
+    sys.path.append(_BACKEND_DIR)
 
 from config.langgraph_config import langgraph_config as config
 
+# 专业智能体节点名称（按协调员默认调用的优先级排序）
+SPECIALIST_AGENTS = ("travel_advisor", "weather_analyst", "budget_optimizer", "local_expert", "itinerary_planner")
+
+# 智能体节点的中文显示名称（用于进度展示）
+AGENT_DISPLAY_NAMES = {
+    "coordinator": "协调员",
+    "travel_advisor": "旅行顾问",
+    "weather_analyst": "天气分析师",
+    "budget_optimizer": "预算优化师",
+    "local_expert": "当地专家",
+    "itinerary_planner": "行程规划师",
+}
+
 # 定义多智能体系统的状态结构
 class TravelPlanState(TypedDict):
     """
@@ -93,6 +109,8 @@ class LangGraphTravelAgents:
             temperature=config.TEMPERATURE,      # 控制生成的随机性
             max_output_tokens=config.MAX_TOKENS, # 最大输出token数
             top_p=config.TOP_P,                 # 核采样参数
+            timeout=config.LLM_REQUEST_TIMEOUT,  # 单次请求超时（秒）
+            max_retries=config.LLM_MAX_RETRIES,  # 最大重试次数
         )
 
         # 初始化智能体工作流图
@@ -146,7 +164,7 @@ class LangGraphTravelAgents:
         )
 
         # 每个智能体都可以使用工具或返回协调员
-        for agent in ["travel_advisor", "weather_analyst", "budget_optimizer", "local_expert", "itinerary_planner"]:
+        for agent in SPECIALIST_AGENTS:
             workflow.add_conditional_edges(
                 agent,                        # 从各个智能体
                 self._agent_router,           # 使用智能体路由器决定下一步
@@ -622,10 +640,9 @@ class LangGraphTravelAgents:
 
         # 默认策略：检查哪些智能体还没有参与工作
         agent_outputs = state.get("agent_outputs", {})
-        required_agents = ["travel_advisor", "weather_analyst", "budget_optimizer", "local_expert", "itinerary_planner"]
 
         # 按优先级顺序调用尚未参与的智能体
-        for agent in required_agents:
+        for agent in SPECIALIST_AGENTS:
             if agent not in agent_outputs:
                 return agent
 
@@ -662,7 +679,9 @@ class LangGraphTravelAgents:
         # 否则返回协调员进行下一步决策
         return "coordinator"
     
-    def run_travel_planning(self, travel_request: Dict[str, Any]) -> Dict[str, Any]:
+    def run_travel_planning(self, travel_request: Dict[str, Any],
+                            cancel_event: Optional[threading.Event] = None,
+                            progress_callback: Optional[Callable[[str, int], None]] = None) -> Dict[str, Any]:
         """
         运行完整的多智能体旅行规划工作流
 
@@ -671,6 +690,9 @@ class LangGraphTravelAgents:
 
         参数：
         - travel_request: 包含旅行需求的字典
+        - cancel_event: 可选的取消信号，调用方设置后会在下一个智能体步骤开始前停止规划
+        - progress_callback: 可选的进度回调，每个智能体步骤完成后以
+          (当前智能体名称, 已完成分析的专业智能体数量) 调用，在执行规划的线程中运行
 
         返回：包含旅行计划和执行结果的字典
 
@@ -697,7 +719,14 @@ class LangGraphTravelAgents:
         # 执行多智能体工作流
         try:
             # 调用LangGraph工作流图，开始多智能体协作
-            final_state = self.graph.invoke(initial_state)
+            # 逐步执行工作流，每完成一个智能体步骤检查一次取消信号，
+            # 调用方超时放弃后不再继续调用大模型；最后一步的状态就是最终状态
+            final_state = initial_state
+            for final_state in self.graph.stream(initial_state, stream_mode="values"):
+                if cancel_event is not None and cancel_event.is_set():
+                    raise RuntimeError("规划已被取消")
+                if progress_callback is not None and final_state.get("current_agent"):
+                    progress_callback(final_state["current_agent"], len(final_state.get("agent_outputs", {})))
 
             # 编译最终的旅行计划
             final_plan = self._compile_final_plan(final_state)
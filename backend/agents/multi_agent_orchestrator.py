@@ -16,7 +16,8 @@
 包括智能体间的通信、协作和决策机制。
 """
 
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Sequence
+from dataclasses import dataclass, field, fields
 from datetime import datetime, timedelta
 import asyncio
 
@@ -26,6 +27,100 @@ from .travel_agents import (
     LocalExpertAgent, ItineraryPlannerAgent, CoordinatorAgent
 )
 
+# 控制台输出使用的分隔线
+_SEPARATOR = "=" * 60
+
+# 智能体ID到中文显示名称的映射
+_AGENT_DISPLAY_NAMES = {
+    'travel_advisor': '旅行顾问',
+    'weather_analyst': '天气分析师',
+    'budget_optimizer': '预算优化师',
+    'local_expert': '当地专家',
+    'itinerary_planner': '行程规划师',
+    'coordinator': '协调员'
+}
+
+@dataclass(slots=True)
+class TripContext:
+    """
+    智能体协作使用的标准化旅行上下文
+
+    相比普通字典，带 __slots__ 的数据类占用内存更少、属性访问更快，
+    字段也一目了然。为了兼容只接受字典的智能体接口，
+    提供了 get() 方法；在序列化边界使用 to_dict() 转换为字典。
+    """
+    destination: str = ''                       # 目的地
+    start_date: Optional[str] = None            # 开始日期
+    end_date: Optional[str] = None              # 结束日期
+    duration: int = 3                           # 旅行天数
+    group_size: int = 1                         # 团队人数
+    budget_range: str = '中等预算'               # 预算范围
+    interests: Sequence[str] = ()               # 兴趣爱好
+    special_requirements: Sequence[str] = ()    # 特殊要求
+    planning_priority: str = 'balanced'         # 规划优先级
+    timestamp: datetime = field(default_factory=datetime.now)  # 时间戳
+    planning_id: str = ''                       # 规划ID
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """按字段名读取，行为与 dict.get 相同（供智能体的字典式接口使用）"""
+        return getattr(self, key, default)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为普通字典，用于序列化和存储"""
+        return {name: getattr(self, name) for name in _TRIP_CONTEXT_FIELDS}
+
+# 用户输入中可以进入旅行上下文的字段
+_TRIP_CONTEXT_FIELDS = tuple(f.name for f in fields(TripContext))
+_USER_CONTEXT_FIELDS = frozenset(_TRIP_CONTEXT_FIELDS) - {'timestamp', 'planning_id'}
+
+# 详细洞察的静态模板
+# 这些内容对所有旅行计划都相同，只在模块加载时创建一次。
+# 元组字段由多个输出直接共享；预算分解是字典，每个输出复制一份。
+_DETAILED_INSIGHTS_TEMPLATE = {
+    # 目的地亮点：旅行顾问的核心推荐（第一条由目的地生成）
+    'destination_highlights_tail': (
+        "当地专家推荐的文化体验",
+        "只有当地人知道的小众景点"
+    ),
+    # 预算分解：预算优化师的成本分析
+    'budget_breakdown': {
+        'accommodation': '住宿占预算35%',
+        'activities': '活动占预算25%',
+        'food': '餐饮占预算25%',
+        'transportation': '交通占预算15%'
+    },
+    # 天气考虑：天气分析师的专业建议
+    'weather_considerations': (
+        "已分析天气预报进行最优规划",
+        "为雨天准备了室内替代方案",
+        "包含季节性活动推荐"
+    ),
+    # 本地贴士：当地专家的内部知识
+    'local_tips': (
+        "参观热门景点的最佳时间",
+        "本地交通内部贴士",
+        "文化礼仪和习俗指导"
+    ),
+    # 优化行程：行程规划师的专业安排
+    'optimized_itinerary': (
+        "每日日程已优化效率",
+        "活动按地理位置聚类安排",
+        "全程体力管理优化"
+    ),
+    # 应急计划：综合风险管理
+    'contingency_plans': (
+        "已准备天气备用计划",
+        "已识别预算灵活性选项",
+        "备用活动建议已就绪"
+    )
+}
+
+# 直接共享模板对象的洞察字段（均为不可变元组）
+_SHARED_INSIGHT_KEYS = (
+    'weather_considerations', 'local_tips',
+    'optimized_itinerary', 'contingency_plans'
+)
+
 class MultiAgentTravelOrchestrator:
     """
     多智能体旅行规划系统的主编排器
@@ -78,7 +173,7 @@ class MultiAgentTravelOrchestrator:
 
         # 初始化系统状态
         self.system_status = 'initialized'      # 系统状态
-        self.current_trip_context = {}          # 当前旅行上下文
+        self.current_trip_context: Optional[TripContext] = None  # 当前旅行上下文
         self.planning_history = []              # 规划历史记录
     
     def plan_comprehensive_trip(self, user_input: Dict[str, Any]) -> Dict[str, Any]:
@@ -97,7 +192,7 @@ class MultiAgentTravelOrchestrator:
         返回：完整的旅行规划结果字典
         """
         print("🚀 多智能体旅行规划系统已启动")
-        print("=" * 60)
+        print(_SEPARATOR)
 
         # 设置旅行上下文
         trip_context = self._prepare_trip_context(user_input)
@@ -127,11 +222,74 @@ class MultiAgentTravelOrchestrator:
         self._store_planning_session(comprehensive_output)
 
         print("\n✅ 多智能体规划完成！")
-        print("=" * 60)
+        print(_SEPARATOR)
         
         return comprehensive_output
+
+    async def aplan_comprehensive_trip(self, user_input: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        plan_comprehensive_trip 的异步版本，按依赖关系重叠执行各阶段
+
+        各阶段之间的依赖关系如下：
+        - 协调规划和五个专业智能体的咨询都只依赖旅行上下文，彼此独立
+        - 协作决策依赖所有咨询结果
+        - 最终优化依赖协作决策，综合输出依赖最终优化
+
+        因此第一阶段和第二阶段的所有咨询会同时启动，
+        总耗时由最长的依赖链决定，而不是所有阶段耗时之和。
+        智能体本身是同步实现的，这里通过 asyncio.to_thread 在线程中执行。
+
+        参数：
+        - user_input: 用户输入的旅行需求字典
+
+        返回：完整的旅行规划结果字典
+        """
+        print("🚀 多智能体旅行规划系统已启动（并发模式）")
+        print(_SEPARATOR)
+
+        trip_context = self._prepare_trip_context(user_input)
+        self.current_trip_context = trip_context
+
+        # 第一、二阶段：协调规划与各智能体咨询同时启动
+        print("\n📋 第一、二阶段：协调规划并咨询各智能体...")
+        coordination_task = asyncio.create_task(
+            asyncio.to_thread(self._coordinate_initial_planning, trip_context)
+        )
+        consultation_tasks = {
+            agent_id: asyncio.create_task(
+                asyncio.to_thread(self._consult_agent, agent_id, task_info, trip_context)
+            )
+            for agent_id, task_info in self._build_consultation_tasks(trip_context).items()
+            if agent_id in self.agents
+        }
+
+        # 按原有顺序收集咨询结果，保证决策综合的结果与同步版本一致
+        agent_recommendations = dict(zip(
+            consultation_tasks.keys(),
+            await asyncio.gather(*consultation_tasks.values())
+        ))
+        await coordination_task
+
+        # 第三阶段：协作决策制定
+        print("\n🧠 第三阶段：协作决策综合...")
+        synthesized_plan = self._synthesize_recommendations(agent_recommendations, trip_context)
+
+        # 第四阶段：最终优化和验证
+        print("\n✨ 第四阶段：最终优化...")
+        final_plan = self._optimize_and_validate_plan(synthesized_plan, trip_context)
+
+        # 第五阶段：生成综合输出
+        print("\n📄 第五阶段：生成最终报告...")
+        comprehensive_output = self._generate_comprehensive_output(final_plan, trip_context)
+
+        self._store_planning_session(comprehensive_output)
+
+        print("\n✅ 多智能体规划完成！")
+        print(_SEPARATOR)
+
+        return comprehensive_output
     
-    def _prepare_trip_context(self, user_input: Dict[str, Any]) -> Dict[str, Any]:
+    def _prepare_trip_context(self, user_input: Dict[str, Any]) -> TripContext:
         """
         为智能体协作准备综合上下文
 
@@ -141,23 +299,16 @@ class MultiAgentTravelOrchestrator:
         参数：
         - user_input: 用户输入字典
 
-        返回：标准化的旅行上下文字典
+        返回：标准化的旅行上下文对象
         """
-        return {
-            'destination': user_input.get('destination', ''),                    # 目的地
-            'start_date': user_input.get('start_date'),                         # 开始日期
-            'end_date': user_input.get('end_date'),                             # 结束日期
-            'duration': user_input.get('duration', 3),                          # 旅行天数
-            'group_size': user_input.get('group_size', 1),                      # 团队人数
-            'budget_range': user_input.get('budget_range', '中等预算'),          # 预算范围
-            'interests': user_input.get('interests', []),                       # 兴趣爱好
-            'special_requirements': user_input.get('special_requirements', []), # 特殊要求
-            'planning_priority': user_input.get('planning_priority', 'balanced'), # 规划优先级
-            'timestamp': datetime.now(),                                        # 时间戳
-            'planning_id': f"trip_{int(datetime.now().timestamp())}"            # 规划ID
-        }
+        now = datetime.now()
+        return TripContext(
+            **{k: v for k, v in user_input.items() if k in _USER_CONTEXT_FIELDS},
+            timestamp=now,                                  # 时间戳
+            planning_id=f"trip_{int(now.timestamp())}"      # 规划ID
+        )
     
-    def _coordinate_initial_planning(self, trip_context: Dict[str, Any]) -> Dict[str, Any]:
+    def _coordinate_initial_planning(self, trip_context: TripContext) -> Dict[str, Any]:
         """
         使用协调员智能体设置规划策略
 
@@ -165,7 +316,7 @@ class MultiAgentTravelOrchestrator:
         确定各个智能体的任务分配和协作方式。
 
         参数：
-        - trip_context: 旅行上下文字典
+        - trip_context: 旅行上下文对象
 
         返回：协调计划字典
         """
@@ -199,7 +350,7 @@ class MultiAgentTravelOrchestrator:
 
         return coordination_plan
     
-    def _execute_parallel_consultation(self, trip_context: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    def _execute_parallel_consultation(self, trip_context: TripContext) -> Dict[str, Dict[str, Any]]:
         """
         与所有相关智能体执行并行咨询
 
@@ -207,31 +358,49 @@ class MultiAgentTravelOrchestrator:
         收集各自领域的专业建议和推荐。
 
         参数：
-        - trip_context: 旅行上下文字典
+        - trip_context: 旅行上下文对象
 
         返回：各智能体推荐结果的字典
         """
         agent_recommendations = {}
 
-        # 为每个智能体定义咨询任务
-        consultation_tasks = {
+        # 执行咨询任务
+        for agent_id, task_info in self._build_consultation_tasks(trip_context).items():
+            if agent_id in self.agents:
+                agent_recommendations[agent_id] = self._consult_agent(agent_id, task_info, trip_context)
+
+        return agent_recommendations
+
+    def _build_consultation_tasks(self, trip_context: TripContext) -> Dict[str, Dict[str, Any]]:
+        """
+        为每个专业智能体定义咨询任务
+
+        这些咨询任务只依赖旅行上下文，彼此之间没有依赖关系，
+        因此既可以顺序执行，也可以并发执行。
+
+        参数：
+        - trip_context: 旅行上下文对象
+
+        返回：智能体ID到咨询任务的字典
+        """
+        return {
             'travel_advisor': {
                 'task': 'destination_analysis',
                 'query_content': {
                     'destination_advice': True,
-                    'destination': trip_context['destination'],
-                    'interests': trip_context['interests'],
-                    'duration': trip_context['duration']
+                    'destination': trip_context.destination,
+                    'interests': trip_context.interests,
+                    'duration': trip_context.duration
                 }
             },
             'weather_analyst': {
                 'task': 'weather_forecast',
                 'query_content': {
                     'weather_analysis': True,
-                    'destination': trip_context['destination'],
+                    'destination': trip_context.destination,
                     'dates': {
-                        'start': trip_context['start_date'],
-                        'end': trip_context['end_date']
+                        'start': trip_context.start_date,
+                        'end': trip_context.end_date
                     }
                 }
             },
@@ -239,79 +408,73 @@ class MultiAgentTravelOrchestrator:
                 'task': 'local_insights',
                 'query_content': {
                     'local_insights': True,
-                    'destination': trip_context['destination'],
-                    'visit_date': trip_context['start_date'],
-                    'interests': trip_context['interests']
+                    'destination': trip_context.destination,
+                    'visit_date': trip_context.start_date,
+                    'interests': trip_context.interests
                 }
             },
             'budget_optimizer': {
                 'task': 'cost_analysis',
                 'query_content': {
                     'budget_optimization': True,
-                    'budget_range': trip_context['budget_range'],
-                    'duration': trip_context['duration'],
-                    'group_size': trip_context['group_size']
+                    'budget_range': trip_context.budget_range,
+                    'duration': trip_context.duration,
+                    'group_size': trip_context.group_size
                 }
             },
             'itinerary_planner': {
                 'task': 'schedule_creation',
                 'query_content': {
                     'create_itinerary': True,
-                    'destination': trip_context['destination'],
-                    'duration': trip_context['duration'],
-                    'interests': trip_context['interests']
+                    'destination': trip_context.destination,
+                    'duration': trip_context.duration,
+                    'interests': trip_context.interests
                 }
             }
         }
+
+    def _consult_agent(self, agent_id: str, task_info: Dict[str, Any],
+                       trip_context: TripContext) -> Dict[str, Any]:
+        """
+        向单个智能体发送咨询请求并收集其建议
+
+        参数：
+        - agent_id: 智能体ID
+        - task_info: 咨询任务信息
+        - trip_context: 旅行上下文对象
+
+        返回：该智能体的咨询结果字典
+        """
+        agent_name = _AGENT_DISPLAY_NAMES.get(agent_id, agent_id)
+        print(f"   🔍 咨询{agent_name}...")
+
+        agent = self.agents[agent_id]
+
+        # 发送查询消息
+        query_message = Message(
+            sender="orchestrator",
+            receiver=agent_id,
+            msg_type=MessageType.QUERY,
+            content=task_info['query_content']
+        )
         
-        # 执行咨询任务
-        for agent_id, task_info in consultation_tasks.items():
-            if agent_id in self.agents:
-                agent_names = {
-                    'travel_advisor': '旅行顾问',
-                    'weather_analyst': '天气分析师',
-                    'local_expert': '当地专家',
-                    'budget_optimizer': '预算优化师',
-                    'itinerary_planner': '行程规划师'
-                }
-                print(f"   🔍 咨询{agent_names.get(agent_id, agent_id)}...")
-
-                agent = self.agents[agent_id]
-
-                # 发送查询消息
-                query_message = Message(
-                    sender="orchestrator",
-                    receiver=agent_id,
-                    msg_type=MessageType.QUERY,
-                    content=task_info['query_content']
-                )
-                
-                agent.receive_message(query_message)
-                responses = agent.process_message_queue()
-                
-                # Also get general recommendation
-                recommendation = agent.generate_recommendation(trip_context)
-                
-                agent_recommendations[agent_id] = {
-                    'query_response': responses[0].content if responses else {},
-                    'general_recommendation': recommendation,
-                    'agent_status': agent.get_status(),
-                    'consultation_timestamp': datetime.now().isoformat()
-                }
-                
-                agent_names = {
-                    'travel_advisor': '旅行顾问',
-                    'weather_analyst': '天气分析师',
-                    'local_expert': '当地专家',
-                    'budget_optimizer': '预算优化师',
-                    'itinerary_planner': '行程规划师'
-                }
-                print(f"     ✓ 已收到来自{agent_names.get(agent_id, agent_id)}的洞察")
+        agent.receive_message(query_message)
+        responses = agent.process_message_queue()
+        
+        # Also get general recommendation
+        recommendation = agent.generate_recommendation(trip_context)
+        
+        print(f"     ✓ 已收到来自{agent_name}的洞察")
 
-        return agent_recommendations
+        return {
+            'query_response': responses[0].content if responses else {},
+            'general_recommendation': recommendation,
+            'agent_status': agent.get_status(),
+            'consultation_timestamp': datetime.now().isoformat()
+        }
 
     def _synthesize_recommendations(self, agent_recommendations: Dict[str, Dict[str, Any]],
-                                   trip_context: Dict[str, Any]) -> Dict[str, Any]:
+                                   trip_context: TripContext) -> Dict[str, Any]:
         """
         使用决策引擎综合所有智能体建议
 
@@ -347,7 +510,7 @@ class MultiAgentTravelOrchestrator:
         return synthesized_decision
     
     def _optimize_and_validate_plan(self, synthesized_plan: Dict[str, Any],
-                                   trip_context: Dict[str, Any]) -> Dict[str, Any]:
+                                   trip_context: TripContext) -> Dict[str, Any]:
         """
         对综合计划进行最终优化和验证
 
@@ -399,7 +562,7 @@ class MultiAgentTravelOrchestrator:
         return optimized_plan
 
     def _generate_comprehensive_output(self, final_plan: Dict[str, Any],
-                                     trip_context: Dict[str, Any]) -> Dict[str, Any]:
+                                     trip_context: TripContext) -> Dict[str, Any]:
         """
         生成综合输出，结合所有智能体的贡献
 
@@ -420,10 +583,10 @@ class MultiAgentTravelOrchestrator:
         comprehensive_output = {
             # 旅行摘要：基本信息概览
             'trip_summary': {
-                'destination': trip_context['destination'],                                    # 目的地
-                'duration': trip_context['duration'],                                         # 旅行时长
-                'dates': f"{trip_context['start_date']} 至 {trip_context['end_date']}",      # 旅行日期
-                'group_size': trip_context['group_size'],                                     # 团队人数
+                'destination': trip_context.destination,                                    # 目的地
+                'duration': trip_context.duration,                                         # 旅行时长
+                'dates': f"{trip_context.start_date} 至 {trip_context.end_date}",      # 旅行日期
+                'group_size': trip_context.group_size,                                     # 团队人数
                 'planning_approach': '多智能体协作规划'                                        # 规划方法
             },
 
@@ -475,7 +638,7 @@ class MultiAgentTravelOrchestrator:
         return comprehensive_output
     
     def _populate_detailed_insights(self, output: Dict[str, Any], plan: Dict[str, Any],
-                                   context: Dict[str, Any]):
+                                   context: TripContext):
         """
         从智能体贡献中填充详细洞察
 
@@ -493,49 +656,21 @@ class MultiAgentTravelOrchestrator:
         """
 
         # 模拟详细洞察（在完整实现中，会从实际智能体响应中提取）
-        destination = context.get('destination', '').title()
-
-        output['detailed_insights'].update({
-            # 目的地亮点：旅行顾问的核心推荐
-            'destination_highlights': [
-                f"{destination}的顶级景点",
-                "当地专家推荐的文化体验",
-                "只有当地人知道的小众景点"
-            ],
-            # 预算分解：预算优化师的成本分析
-            'budget_breakdown': {
-                'accommodation': '住宿占预算35%',
-                'activities': '活动占预算25%',
-                'food': '餐饮占预算25%',
-                'transportation': '交通占预算15%'
-            },
-            # 天气考虑：天气分析师的专业建议
-            'weather_considerations': [
-                "已分析天气预报进行最优规划",
-                "为雨天准备了室内替代方案",
-                "包含季节性活动推荐"
-            ],
-            # 本地贴士：当地专家的内部知识
-            'local_tips': [
-                "参观热门景点的最佳时间",
-                "本地交通内部贴士",
-                "文化礼仪和习俗指导"
-            ],
-            # 优化行程：行程规划师的专业安排
-            'optimized_itinerary': [
-                "每日日程已优化效率",
-                "活动按地理位置聚类安排",
-                "全程体力管理优化"
-            ],
-            # 应急计划：综合风险管理
-            'contingency_plans': [
-                "已准备天气备用计划",
-                "已识别预算灵活性选项",
-                "备用活动建议已就绪"
-            ]
-        })
-
-    def _identify_primary_concern(self, trip_context: Dict[str, Any]) -> str:
+        destination = context.destination.title()
+
+        insights = output['detailed_insights']
+        # 目的地亮点：只有第一条随目的地变化，其余直接复用模板
+        insights['destination_highlights'] = [
+            f"{destination}的顶级景点",
+            *_DETAILED_INSIGHTS_TEMPLATE['destination_highlights_tail']
+        ]
+        # 预算分解是可修改的字典，每个计划使用自己的副本，修改一个计划不会影响其他计划
+        insights['budget_breakdown'] = dict(_DETAILED_INSIGHTS_TEMPLATE['budget_breakdown'])
+        # 其余洞察是不可变的元组，在所有计划之间共享同一份模板对象
+        for key in _SHARED_INSIGHT_KEYS:
+            insights[key] = _DETAILED_INSIGHTS_TEMPLATE[key]
+
+    def _identify_primary_concern(self, trip_context: TripContext) -> str:
         """
         识别决策权重的主要关注点
 
@@ -543,7 +678,7 @@ class MultiAgentTravelOrchestrator:
         确定在多智能体决策过程中应该优先考虑的因素。
 
         参数：
-        - trip_context: 旅行上下文信息字典
+        - trip_context: 旅行上下文对象
 
         返回：主要关注点的字符串标识
 
@@ -551,14 +686,14 @@ class MultiAgentTravelOrchestrator:
         这个方法展示了如何在复杂的决策系统中
         根据用户偏好调整决策权重。
         """
-        priority = trip_context.get('planning_priority', 'balanced')
+        priority = trip_context.planning_priority
 
         # 决策优先级判断逻辑
-        if priority == 'budget' or trip_context.get('budget_range') == 'budget':
+        if priority == 'budget' or trip_context.budget_range == 'budget':
             return 'budget'          # 预算优先
-        elif 'weather' in trip_context.get('special_requirements', []):
+        elif 'weather' in trip_context.special_requirements:
             return 'weather'         # 天气优先
-        elif 'local_experience' in trip_context.get('interests', []):
+        elif 'local_experience' in trip_context.interests:
             return 'local_insights'  # 本地体验优先
         else:
             return 'balanced'        # 平衡考虑
@@ -579,11 +714,11 @@ class MultiAgentTravelOrchestrator:
         """
         session_record = {
             'timestamp': datetime.now().isoformat(),                                                                    # 时间戳
-            'trip_id': self.current_trip_context.get('planning_id'),                                                   # 旅行ID
-            'destination': self.current_trip_context.get('destination'),                                               # 目的地
+            'trip_id': self.current_trip_context.planning_id,                                                          # 旅行ID
+            'destination': self.current_trip_context.destination,                                                      # 目的地
             'agents_used': list(self.agents.keys()),                                                                   # 使用的智能体
             'quality_score': output.get('system_performance', {}).get('quality_metrics', {}).get('overall_quality_score', 0),  # 质量评分
-            'user_context': self.current_trip_context                                                                  # 用户上下文
+            'user_context': self.current_trip_context.to_dict()                                                        # 用户上下文
         }
 
         self.planning_history.append(session_record)
@@ -633,17 +768,8 @@ class MultiAgentTravelOrchestrator:
         }
 
         # 展示智能体网络结构
-        agent_names = {
-            'travel_advisor': '旅行顾问',
-            'weather_analyst': '天气分析师',
-            'budget_optimizer': '预算优化师',
-            'local_expert': '当地专家',
-            'itinerary_planner': '行程规划师',
-            'coordinator': '协调员'
-        }
-
         for agent_id, agent in self.agents.items():
-            demo_output['agent_network'][agent_names.get(agent_id, agent_id)] = {
+            demo_output['agent_network'][_AGENT_DISPLAY_NAMES.get(agent_id, agent_id)] = {
                 'role': agent.role.value,                                    # 智能体角色
                 'capabilities': agent.capabilities,                          # 能力列表
                 'connected_agents': len(agent.collaboration_network),        # 连接的智能体数量
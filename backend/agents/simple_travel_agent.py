@@ -28,7 +28,9 @@ class SimpleTravelAgent:
             model=config.GEMINI_MODEL,
             google_api_key=config.GEMINI_API_KEY,
             temperature=config.TEMPERATURE,
-            max_tokens=config.MAX_TOKENS
+            max_tokens=config.MAX_TOKENS,
+            timeout=config.LLM_REQUEST_TIMEOUT,
+            max_retries=config.LLM_MAX_RETRIES
         )
     
     def run_travel_planning(self, travel_request: Dict[str, Any]) -> Dict[str, Any]:
@@ -17,61 +17,440 @@ import os
 import asyncio
 import json
 import uuid
-from datetime import datetime
-from typing import Dict, Any, Optional
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+import threading
+import concurrent.futures
+import functools
+import dataclasses
+import time
+import shutil
+from contextlib import asynccontextmanager, suppress
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Dict, Any, Optional, Tuple, Callable, Awaitable
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import FileResponse, JSONResponse, ORJSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 import uvicorn
+import psutil
 
-# 添加当前目录到Python路径
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+# orjson 是可选依赖：安装后用于所有JSON序列化，未安装时回退到标准库 json
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-from agents.langgraph_agents import LangGraphTravelAgents
+# 添加当前目录到Python路径（已存在时不再重复添加）
+_BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+if _BACKEND_DIR not in sys.path:
+    sys.path.append(_BACKEND_DIR)
+
+from agents.langgraph_agents import LangGraphTravelAgents, SPECIALIST_AGENTS, AGENT_DISPLAY_NAMES
 from agents.simple_travel_agent import SimpleTravelAgent, MockTravelAgent
 from config.langgraph_config import langgraph_config as config
+from utils.plan_cache import PlanCache
 
-# 创建FastAPI应用
-app = FastAPI(
-    title="AI旅行规划智能体API",
-    description="基于LangGraph框架的多智能体旅行规划系统API",
-    version="1.0.0"
+def _json_default(obj: Any) -> Any:
+    """处理JSON不直接支持的对象：数据类转换为字典（orjson可直接序列化数据类），其他对象转换为字符串"""
+    if dataclasses.is_dataclass(obj):
+        return {f.name: getattr(obj, f.name) for f in dataclasses.fields(obj)}
+    return str(obj)
+
+def json_dumps(obj: Any, indent: bool = False) -> bytes:
+    """把对象序列化为UTF-8编码的JSON字节串"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, option=option, default=_json_default)
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None, default=_json_default).encode('utf-8')
+
+def json_loads(data: bytes) -> Any:
+    """解析JSON字节串"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def json_fragment(data: bytes) -> Any:
+    """
+    把已经序列化好的JSON字节串包装为可嵌入其他对象的片段
+
+    安装了orjson时，json_dumps 会把片段原样写入输出，不再解析和重新序列化；
+    使用标准库 json 时只能先解析为对象。
+    """
+    if orjson is not None:
+        return orjson.Fragment(data)
+    return json.loads(data)
+
+# 规划任务共用的线程池
+# LangGraph规划的大部分时间在等待大模型接口返回，线程等待网络时会释放GIL，
+# 所以线程池就能让多个请求并行执行；全局共用一个线程池，避免每个请求都创建和销毁线程。
+# 线程数按配置而不是CPU核数决定，并且比同时执行的规划数多，
+# 超时后仍在等待大模型返回的线程不会占满线程池
+PLANNING_MAX_WORKERS = max(config.PLANNING_THREAD_POOL_SIZE, 2)
+PLANNING_CONCURRENCY = max(1, min(config.PLANNING_CONCURRENCY, PLANNING_MAX_WORKERS - 1))
+planning_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=PLANNING_MAX_WORKERS,
+    thread_name_prefix="planning"
 )
 
-# 添加CORS中间件，允许前端访问
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # 在生产环境中应该限制为特定域名
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+# 简化版备选方案使用单独的小线程池，不会排在它要替代的超时规划线程后面
+fallback_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=max(config.FALLBACK_THREAD_POOL_SIZE, 1),
+    thread_name_prefix="planning-fallback"
 )
 
+# 规划任务队列
+# 接口只负责把任务放入队列并立即返回，后台固定数量的worker协程依次取出执行。
+# worker数量（同时执行的规划数）小于线程池大小，排队中的任务不会提前开始计算超时时间。
+planning_queue: asyncio.Queue = asyncio.Queue()
+
+def enqueue_planning(job: Callable[[], Awaitable[None]]):
+    """把一个规划任务（无参数的协程函数）放入队列"""
+    planning_queue.put_nowait(job)
+
+async def planning_worker():
+    """后台worker：循环从队列中取出规划任务并执行"""
+    while True:
+        job = await planning_queue.get()
+        try:
+            await job()
+        except Exception as e:
+            print(f"规划任务执行出错: {str(e)}")
+        finally:
+            planning_queue.task_done()
+
+# 智能体实例缓存
+# 智能体只保存大模型客户端和编译好的工作流图，每次规划的状态都在调用内部新建，
+# 因此一个实例可以被多个请求（包括线程池中的并发规划）共用，不必每个任务重新初始化
+_travel_agents: Optional[LangGraphTravelAgents] = None
+_simple_agent: Optional[SimpleTravelAgent] = None
+mock_agent = MockTravelAgent()
+
+async def get_travel_agents() -> LangGraphTravelAgents:
+    """获取共享的LangGraph智能体，首次调用时在线程中完成初始化"""
+    global _travel_agents
+    if _travel_agents is None:
+        _travel_agents = await asyncio.to_thread(LangGraphTravelAgents)
+    return _travel_agents
+
+async def get_simple_agent() -> SimpleTravelAgent:
+    """获取共享的简化智能体，首次调用时在线程中完成初始化"""
+    global _simple_agent
+    if _simple_agent is None:
+        _simple_agent = await asyncio.to_thread(SimpleTravelAgent)
+    return _simple_agent
+
+# 规划结果缓存（可通过环境变量 PLAN_CACHE_ENABLED=false 关闭）
+plan_cache: Optional[PlanCache] = (
+    PlanCache(config.PLAN_CACHE_FILE, ttl=config.PLAN_CACHE_TTL, max_bytes=config.PLAN_CACHE_MAX_BYTES)
+    if config.PLAN_CACHE_ENABLED else None
+)
+
+def build_langgraph_request(travel_request: Dict[str, Any]) -> Dict[str, Any]:
+    """把API请求转换为LangGraph智能体使用的请求格式"""
+    return {
+        "destination": travel_request["destination"],
+        "duration": travel_request.get("duration", 7),
+        "budget_range": travel_request["budget_range"],
+        "interests": travel_request["interests"],
+        "group_size": travel_request["group_size"],
+        "travel_dates": f"{travel_request['start_date']} 至 {travel_request['end_date']}"
+    }
+
+def plan_cache_key(langgraph_request: Dict[str, Any]) -> str:
+    """计算规划缓存的键：兴趣列表排序后参与计算，顺序不同的相同兴趣视为同一请求"""
+    return PlanCache.fingerprint({
+        **langgraph_request,
+        "destination": langgraph_request["destination"].strip(),
+        "interests": sorted(langgraph_request["interests"])
+    })
+
+@dataclass(slots=True)
+class TaskRecord:
+    """
+    规划任务记录
+
+    所有任务的字段都相同，使用 __slots__ 数据类代替字典，
+    每条记录不再单独保存一份键名哈希表，内存占用更小，属性访问也更快。
+    """
+    task_id: str
+    status: str = "started"
+    progress: int = 0
+    current_agent: str = ""
+    message: str = ""
+    created_at: str = ""
+    request: Dict[str, Any] = field(default_factory=dict)
+    result: Optional[Dict[str, Any]] = None
+    result_file: Optional[str] = None  # 结果文件名，结果已写入文件时 result 为空
+
+    def apply(self, patch: Dict[str, Any]):
+        """应用一组字段变更（忽略不认识的字段，兼容旧版本写入的数据）"""
+        for name, value in patch.items():
+            if name in _TASK_RECORD_FIELDS:
+                setattr(self, name, value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典（浅拷贝）"""
+        return {name: getattr(self, name) for name in _TASK_RECORD_FIELDS}
+
+_TASK_RECORD_FIELDS = frozenset(f.name for f in dataclasses.fields(TaskRecord))
+
 # 全局变量存储任务状态
-planning_tasks: Dict[str, Dict[str, Any]] = {}
+planning_tasks: Dict[str, TaskRecord] = {}
+
+# 尚未写入日志的任务变更（任务ID -> 合并后的变更字段）
+# 同一任务在一个写入周期内的多次更新只会写成一行日志
+_pending_task_patches: Dict[str, Dict[str, Any]] = {}
+
+# 预先序列化的响应内容：任务变更时失效，查询时直接返回字节串，避免每次轮询都重新构建和序列化
+_tasks_index_cache: Optional[bytes] = None        # /tasks 的响应内容
+_task_status_cache: Dict[Tuple[str, bool], bytes] = {}  # (任务ID, 是否精简) -> /status 的响应内容
+
+# 任务状态变化通知：只为正在订阅 /status/{task_id}/stream 的任务创建事件，
+# 任务变化时唤醒所有等待者，下一次订阅会创建新的事件
+_task_events: Dict[str, asyncio.Event] = {}
+
+def _invalidate_task_responses(task_id: str, index: bool = True):
+    """让任务的预序列化响应失效，并通知状态流的订阅者"""
+    global _tasks_index_cache
+    _task_status_cache.pop((task_id, False), None)
+    _task_status_cache.pop((task_id, True), None)
+    if index:
+        _tasks_index_cache = None
+    event = _task_events.pop(task_id, None)
+    if event is not None:
+        event.set()
+
+# 任务数量和保留时间上限：已结束的任务超过保留时间或总数超过上限时会被淘汰，
+# 长时间运行的服务内存和快照大小不会无限增长
+TASKS_MAX_ENTRIES = 1000     # 内存中最多保留的任务数
+TASKS_TTL = 24 * 3600        # 已结束任务的保留时间（秒）
+_FINISHED_STATUSES = ("completed", "failed")
+
+def add_task(record: TaskRecord):
+    """登记新任务，完整记录会在下一个写入周期写入日志"""
+    task_id = record.task_id
+    planning_tasks[task_id] = record
+    _pending_task_patches[task_id] = record.to_dict()
+    _invalidate_task_responses(task_id)
+    if len(planning_tasks) > TASKS_MAX_ENTRIES:
+        evict_tasks()
+
+def update_task(task_id: str, **fields: Any):
+    """
+    更新任务记录的字段
+
+    任务字典只在事件循环线程中读写，协程在两次 await 之间对它的修改
+    不会被其他请求打断，因此不需要加锁。工作线程不能直接调用本函数，
+    需要通过 loop.call_soon_threadsafe 把更新交给事件循环执行。
+    """
+    task = planning_tasks.get(task_id)
+    if task is not None:
+        for name, value in fields.items():
+            setattr(task, name, value)
+        _pending_task_patches.setdefault(task_id, {}).update(fields)
+        # 任务列表只包含状态字段，其他字段变化时不需要重建
+        _invalidate_task_responses(task_id, index="status" in fields)
+
+def evict_tasks() -> int:
+    """
+    淘汰过期或超出数量上限的已结束任务，返回淘汰的任务数
+
+    planning_tasks 按创建顺序插入，从最早的任务开始检查，遇到未过期且
+    数量未超限的任务即可停止。未结束的任务不会被淘汰，避免后台规划
+    写入已删除的任务。
+    """
+    global _tasks_log_dirty
+    # created_at 是ISO格式字符串，按字符串比较即按时间先后比较
+    expire_before = (datetime.now() - timedelta(seconds=TASKS_TTL)).isoformat()
+    excess = len(planning_tasks) - TASKS_MAX_ENTRIES
+    evicted = []
+    for task_id, task in planning_tasks.items():
+        if excess <= 0 and task.created_at >= expire_before:
+            break
+        if task.status in _FINISHED_STATUSES:
+            evicted.append(task_id)
+            excess -= 1
+
+    for task_id in evicted:
+        del planning_tasks[task_id]
+        _pending_task_patches.pop(task_id, None)
+        result_file_stats.pop(task_id, None)
+        _invalidate_task_responses(task_id)
+    if evicted:
+        # 让下一次快照写入淘汰后的任务列表
+        with _tasks_log_lock:
+            _tasks_log_dirty = True
+    return len(evicted)
+
+# 规划结果文件目录（服务启动时创建）
+RESULTS_DIR = "results"
+
+# 结果文件写入时的文件状态缓存（任务ID -> os.stat_result），仅保存在内存中
+result_file_stats: Dict[str, os.stat_result] = {}
 
 # 任务持久化文件
+# 任务状态以“快照 + 追加日志”的方式持久化：
+# - 变更先在内存中按任务合并，每隔 TASKS_FLUSH_INTERVAL 秒向日志追加 {"id": 任务ID, "patch": 变更字段}，
+#   写入量与任务总数无关，进度频繁更新也不会频繁写盘
+# - 后台定期把内存中的全部任务写成快照，并清空已合并的日志
+# - 启动时先读取快照，再按顺序重放日志恢复最新状态
 TASKS_FILE = "tasks_state.json"
+TASKS_LOG_FILE = "tasks_state.log"
+TASKS_SNAPSHOT_INTERVAL = 60  # 快照间隔（秒）
+TASKS_FLUSH_INTERVAL = 0.5    # 合并写入日志的间隔（秒）
+
+_tasks_log_lock = threading.Lock()
+_tasks_log_file = None
+_tasks_log_dirty = False
+
+def _task_event_line(task_id: str, patch: Dict[str, Any]) -> bytes:
+    """把一条任务变更序列化为日志行"""
+    return json_dumps({"id": task_id, "patch": patch}) + b"\n"
 
-def save_tasks_state():
-    """保存任务状态到文件"""
+def _append_tasks_log(line: bytes):
+    """向任务日志追加一行（日志文件只打开一次）"""
+    global _tasks_log_file, _tasks_log_dirty
     try:
-        with open(TASKS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(planning_tasks, f, ensure_ascii=False, indent=2, default=str)
+        with _tasks_log_lock:
+            if _tasks_log_file is None:
+                _tasks_log_file = open(TASKS_LOG_FILE, 'ab')
+            _tasks_log_file.write(line)
+            _tasks_log_file.flush()
+            _tasks_log_dirty = True
     except Exception as e:
-        print(f"保存任务状态失败: {e}")
+        print(f"写入任务日志失败: {e}")
+
+async def flush_task_events():
+    """
+    把等待中的任务变更批量追加到日志，不阻塞事件循环
+
+    变更内容在事件循环线程中序列化（此时任务字典不会被并发修改），
+    文件写入放到线程中执行。
+    """
+    if not _pending_task_patches:
+        return
+    lines = b"".join(_task_event_line(task_id, patch) for task_id, patch in _pending_task_patches.items())
+    _pending_task_patches.clear()
+    await asyncio.to_thread(_append_tasks_log, lines)
+
+async def flush_task_events_periodically():
+    """后台定期写入任务变更，进度频繁更新时每个周期最多写一次"""
+    while True:
+        await asyncio.sleep(TASKS_FLUSH_INTERVAL)
+        await flush_task_events()
+
+def _rotate_tasks_log() -> Optional[bytes]:
+    """
+    在事件循环线程中序列化当前快照，并把日志轮转为待合并文件
+
+    返回快照内容；日志自上次快照以来没有变化时返回None。
+    """
+    global _tasks_log_file, _tasks_log_dirty
+    with _tasks_log_lock:
+        if not _tasks_log_dirty:
+            return None
+        snapshot = json_dumps(planning_tasks, indent=True)
+        if _tasks_log_file is not None:
+            _tasks_log_file.close()
+            _tasks_log_file = None
+        if os.path.exists(TASKS_LOG_FILE):
+            old_log_file = TASKS_LOG_FILE + ".old"
+            if os.path.exists(old_log_file):
+                # 上次快照写入失败，旧日志还没有合并：追加到旧日志末尾而不是覆盖，保证重放顺序不变
+                with open(TASKS_LOG_FILE, 'rb') as src, open(old_log_file, 'ab') as dst:
+                    shutil.copyfileobj(src, dst)
+                os.remove(TASKS_LOG_FILE)
+            else:
+                os.replace(TASKS_LOG_FILE, old_log_file)
+        _tasks_log_dirty = False
+        return snapshot
+
+def _mark_tasks_log_dirty():
+    """快照写入失败时恢复日志的未合并标记，下一个周期会重新写入快照"""
+    global _tasks_log_dirty
+    with _tasks_log_lock:
+        _tasks_log_dirty = True
+
+def _write_tasks_snapshot(snapshot: bytes):
+    """原子地写入快照文件，然后删除已合并的旧日志"""
+    tmp_file = TASKS_FILE + ".tmp"
+    with open(tmp_file, 'wb') as f:
+        f.write(snapshot)
+    os.replace(tmp_file, TASKS_FILE)
+    if os.path.exists(TASKS_LOG_FILE + ".old"):
+        os.remove(TASKS_LOG_FILE + ".old")
+
+# 同一时间只有一次快照写入，避免两次写入同时使用临时文件
+_tasks_snapshot_lock = asyncio.Lock()
+
+async def save_tasks_state():
+    """把任务状态合并为快照文件"""
+    async with _tasks_snapshot_lock:
+        try:
+            snapshot = _rotate_tasks_log()
+            if snapshot is None:
+                return
+            write = asyncio.ensure_future(asyncio.to_thread(_write_tasks_snapshot, snapshot))
+            try:
+                await asyncio.shield(write)
+            except asyncio.CancelledError:
+                # 线程中的写入无法被取消，等它结束后再释放锁
+                try:
+                    await write
+                except Exception:
+                    _mark_tasks_log_dirty()
+                raise
+        except Exception as e:
+            # 轮转后的旧日志仍然保留在磁盘上，恢复未合并标记，下次快照时一起合并
+            _mark_tasks_log_dirty()
+            print(f"保存任务状态失败: {e}")
+
+async def snapshot_tasks_periodically():
+    """后台定期合并任务日志"""
+    while True:
+        await asyncio.sleep(TASKS_SNAPSHOT_INTERVAL)
+        evict_tasks()
+        await save_tasks_state()
+
+def _replay_tasks_log(log_file: str) -> int:
+    """按顺序重放任务日志，返回应用的变更条数"""
+    applied = 0
+    if not os.path.exists(log_file):
+        return applied
+    with open(log_file, 'rb') as f:
+        for line in f:
+            try:
+                event = json_loads(line)
+            except ValueError:
+                # 进程异常退出时最后一行可能不完整
+                continue
+            task_id = event["id"]
+            task = planning_tasks.get(task_id)
+            if task is None:
+                task = planning_tasks[task_id] = TaskRecord(task_id=task_id)
+            task.apply(event["patch"])
+            applied += 1
+    return applied
 
 def load_tasks_state():
-    """从文件加载任务状态"""
-    global planning_tasks
+    """从快照和日志加载任务状态"""
+    global planning_tasks, _tasks_log_dirty
     try:
         if os.path.exists(TASKS_FILE):
-            with open(TASKS_FILE, 'r', encoding='utf-8') as f:
-                planning_tasks = json.load(f)
-            print(f"✅ 已加载 {len(planning_tasks)} 个任务状态")
+            with open(TASKS_FILE, 'rb') as f:
+                snapshot = json_loads(f.read())
+            planning_tasks = {}
+            for task_id, data in snapshot.items():
+                task = planning_tasks[task_id] = TaskRecord(task_id=task_id)
+                task.apply(data)
         else:
             print("📝 任务状态文件不存在，使用空状态")
+        # 先重放上次未合并完成的旧日志，再重放当前日志
+        replayed = _replay_tasks_log(TASKS_LOG_FILE + ".old") + _replay_tasks_log(TASKS_LOG_FILE)
+        _tasks_log_dirty = replayed > 0
+        evicted = evict_tasks()
+        print(f"✅ 已加载 {len(planning_tasks)} 个任务状态（重放 {replayed} 条日志，淘汰 {evicted} 个过期任务）")
     except Exception as e:
         print(f"加载任务状态失败: {e}")
         planning_tasks = {}
@@ -79,11 +458,64 @@ def load_tasks_state():
 # 启动时加载任务状态
 load_tasks_state()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期：启动规划worker和后台快照任务，关闭时写入最终快照"""
+    flush_task = asyncio.create_task(flush_task_events_periodically())
+    snapshot_task = asyncio.create_task(snapshot_tasks_periodically())
+    workers = [asyncio.create_task(planning_worker()) for _ in range(PLANNING_CONCURRENCY)]
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    # 预热CPU使用率采样，之后 /health 可以用非阻塞方式读取
+    psutil.cpu_percent(interval=None)
+    # 预先初始化智能体，失败时（例如未配置API密钥）不影响服务启动，首次请求时会再次尝试
+    try:
+        await get_travel_agents()
+        await get_simple_agent()
+    except Exception as e:
+        print(f"预加载智能体失败，将在首次请求时重试: {str(e)}")
+    try:
+        yield
+    finally:
+        flush_task.cancel()
+        snapshot_task.cancel()
+        for worker in workers:
+            worker.cancel()
+        # 等待被取消的快照任务结束（包括已在线程中进行的写入），再写入最终快照
+        with suppress(asyncio.CancelledError):
+            await snapshot_task
+        await flush_task_events()
+        await save_tasks_state()
+        # 不再等待仍在运行的规划线程，尚未开始的任务直接取消
+        planning_executor.shutdown(wait=False, cancel_futures=True)
+        fallback_executor.shutdown(wait=False, cancel_futures=True)
+
+# 创建FastAPI应用
+app = FastAPI(
+    title="AI旅行规划智能体API",
+    description="基于LangGraph框架的多智能体旅行规划系统API",
+    version="1.0.0",
+    lifespan=lifespan,
+    # 安装了orjson时使用ORJSONResponse序列化所有接口响应
+    default_response_class=ORJSONResponse if orjson is not None else JSONResponse
+)
+
+# 添加CORS中间件，允许前端访问
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],  # 在生产环境中应该限制为特定域名
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# 压缩较大的响应（完整规划结果通常有几十KB）；Starlette 0.46.0 起不压缩SSE状态流（见 requirements.txt）
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 class TravelRequest(BaseModel):
     """旅行规划请求模型"""
     destination: str
-    start_date: str
-    end_date: str
+    start_date: date  # 请求中的 "YYYY-MM-DD" 字符串由Pydantic在校验时直接解析为日期
+    end_date: date
     budget_range: str
     group_size: int
     interests: list[str] = []
@@ -96,6 +528,12 @@ class TravelRequest(BaseModel):
     special_requirements: str = ""
     currency: str = "CNY"
 
+    def to_travel_request(self) -> Dict[str, Any]:
+        """转换为任务使用的请求字典，日期保留为字符串并补充旅行天数"""
+        travel_request = self.model_dump(mode="json")
+        travel_request["duration"] = (self.end_date - self.start_date).days + 1
+        return travel_request
+
 class PlanningResponse(BaseModel):
     """规划响应模型"""
     task_id: str
@@ -128,6 +566,10 @@ async def root():
         ]
     }
 
+# 健康检查的系统资源缓存
+HEALTH_CACHE_TTL = 2.0  # 缓存有效期（秒）
+_health_cache: Dict[str, Any] = {"ts": 0.0, "data": None}
+
 @app.get("/health")
 async def health_check():
     """健康检查端点"""
@@ -142,21 +584,26 @@ async def health_check():
                 "timestamp": datetime.now().isoformat()
             }
         
-        # 检查系统资源
-        import psutil
-        memory_info = psutil.virtual_memory()
-        cpu_percent = psutil.cpu_percent(interval=1)
+        # 检查系统资源（结果缓存几秒，频繁的探活请求不会重复采集）
+        now = time.monotonic()
+        if _health_cache["data"] is None or now - _health_cache["ts"] >= HEALTH_CACHE_TTL:
+            memory_info = await asyncio.to_thread(psutil.virtual_memory)
+            # interval=None 不等待，返回距上次调用以来的CPU使用率（启动时已预热）
+            cpu_percent = psutil.cpu_percent(interval=None)
+            _health_cache["data"] = {
+                "cpu_usage": f"{cpu_percent}%",
+                "memory_usage": f"{memory_info.percent}%",
+                "memory_available": f"{memory_info.available / 1024 / 1024 / 1024:.1f}GB"
+            }
+            _health_cache["ts"] = now
         
         return {
             "status": "healthy",
             "gemini_model": config.GEMINI_MODEL,
             "api_key_configured": bool(config.GEMINI_API_KEY),
-            "system_info": {
-                "cpu_usage": f"{cpu_percent}%",
-                "memory_usage": f"{memory_info.percent}%",
-                "memory_available": f"{memory_info.available / 1024 / 1024 / 1024:.1f}GB"
-            },
+            "system_info": _health_cache["data"],
             "active_tasks": len(planning_tasks),
+            "queued_tasks": planning_queue.qsize(),
             "timestamp": datetime.now().isoformat()
         }
     except Exception as e:
@@ -166,38 +613,60 @@ async def health_check():
             "timestamp": datetime.now().isoformat()
         }
 
+# 规划失败时的回退结果模板：timeout 为LangGraph处理超时，error 为智能体出错
+_FALLBACK_MODES = {
+    "timeout": {
+        "summary_suffix": "（快速模式）",
+        "response": "由于系统负载较高，为您提供快速旅行计划。目的地：{destination}，预算：{budget_range}，人数：{group_size}人。建议您关注当地的热门景点、特色美食和文化体验。",
+        "task_message": "旅行规划完成（快速模式）",
+    },
+    "error": {
+        "summary_suffix": "",
+        "response": "系统正在维护中，为您提供基础的旅行计划框架。目的地：{destination}，预算：{budget_range}，人数：{group_size}人。建议提前了解当地的交通、住宿和主要景点信息。",
+        "task_message": "旅行规划完成（简化模式）",
+    },
+}
+
+def _build_fallback_result(travel_request: Dict[str, Any], mode: str) -> Dict[str, Any]:
+    """根据请求生成回退用的简化旅行计划，mode 为 _FALLBACK_MODES 中的键"""
+    template = _FALLBACK_MODES[mode]
+    destination = travel_request["destination"]
+    duration = travel_request.get("duration", 7)
+    return {
+        "success": True,
+        "travel_plan": {
+            "destination": destination,
+            "duration": duration,
+            "budget_range": travel_request["budget_range"],
+            "group_size": travel_request["group_size"],
+            "travel_dates": f"{travel_request['start_date']} 至 {travel_request['end_date']}",
+            "summary": f"为{destination}制定的{duration}天旅行计划{template['summary_suffix']}"
+        },
+        "agent_outputs": {
+            "system_message": {
+                "response": template["response"].format(
+                    destination=destination,
+                    budget_range=travel_request["budget_range"],
+                    group_size=travel_request["group_size"]
+                ),
+                "timestamp": datetime.now().isoformat(),
+                "status": "completed"
+            }
+        },
+        "total_iterations": 1,
+        "planning_complete": True
+    }
+
 async def run_planning_task(task_id: str, travel_request: Dict[str, Any]):
     """异步执行旅行规划任务"""
     try:
         print(f"开始执行任务 {task_id}")
         
         # 更新任务状态
-        planning_tasks[task_id]["status"] = "processing"
-        planning_tasks[task_id]["progress"] = 10
-        planning_tasks[task_id]["message"] = "正在初始化AI旅行规划智能体..."
-        
-        # 模拟处理时间，避免立即完成
-        await asyncio.sleep(1)
-        
-        planning_tasks[task_id]["progress"] = 30
-        planning_tasks[task_id]["message"] = "多智能体系统已启动，开始协作规划..."
-        
-        await asyncio.sleep(1)
+        update_task(task_id, status="processing", progress=10, message="正在初始化AI旅行规划智能体...")
         
         # 转换请求格式
-        langgraph_request = {
-            "destination": travel_request["destination"],
-            "duration": travel_request.get("duration", 7),
-            "budget_range": travel_request["budget_range"],
-            "interests": travel_request["interests"],
-            "group_size": travel_request["group_size"],
-            "travel_dates": f"{travel_request['start_date']} 至 {travel_request['end_date']}"
-        }
-        
-        planning_tasks[task_id]["progress"] = 50
-        planning_tasks[task_id]["message"] = "智能体团队正在协作分析..."
-        
-        await asyncio.sleep(1)
+        langgraph_request = build_langgraph_request(travel_request)
         
         print(f"任务 {task_id}: 开始LangGraph处理")
         
@@ -206,48 +675,73 @@ async def run_planning_task(task_id: str, travel_request: Dict[str, Any]):
             async def run_langgraph():
                 # 初始化AI旅行规划智能体
                 print(f"任务 {task_id}: 初始化AI旅行规划智能体")
-                planning_tasks[task_id]["progress"] = 50
-                planning_tasks[task_id]["message"] = "初始化AI旅行规划智能体..."
+                update_task(task_id, progress=50, message="初始化AI旅行规划智能体...")
 
                 try:
-                    travel_agents = LangGraphTravelAgents()
+                    travel_agents = await get_travel_agents()
                     print(f"任务 {task_id}: AI旅行规划智能体初始化完成")
 
-                    planning_tasks[task_id]["progress"] = 60
-                    planning_tasks[task_id]["message"] = "开始多智能体协作..."
+                    update_task(task_id, progress=60, message="开始多智能体协作...")
 
                     print(f"任务 {task_id}: 执行旅行规划")
-                    # 在线程池中执行规划，避免阻塞
-                    import concurrent.futures
-
-                    def run_planning():
-                        return travel_agents.run_travel_planning(langgraph_request)
-
-                    # 使用线程池执行，设置超时
-                    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
-                        future = executor.submit(run_planning)
-                        try:
-                            # 等待最多4分钟
-                            result = future.result(timeout=240)
-                            print(f"任务 {task_id}: LangGraph执行完成，结果: {result.get('success', False)}")
-                            return result
-                        except concurrent.futures.TimeoutError:
-                            print(f"任务 {task_id}: LangGraph执行超时，尝试使用简化版本")
-                            planning_tasks[task_id]["progress"] = 80
-                            planning_tasks[task_id]["message"] = "LangGraph超时，使用简化版本..."
-
-                            # 使用简化版本作为备选方案
-                            simple_agent = SimpleTravelAgent()
-                            return simple_agent.run_travel_planning(langgraph_request)
-
-                        except Exception as e:
-                            print(f"任务 {task_id}: LangGraph执行异常: {str(e)}，尝试使用简化版本")
-                            planning_tasks[task_id]["progress"] = 80
-                            planning_tasks[task_id]["message"] = "LangGraph异常，使用简化版本..."
-
-                            # 使用简化版本作为备选方案
-                            simple_agent = SimpleTravelAgent()
-                            return simple_agent.run_travel_planning(langgraph_request)
+                    # 在共享线程池中执行规划，await 等待结果期间事件循环可以继续处理其他请求
+                    loop = asyncio.get_running_loop()
+                    # 线程无法被强制终止，超时或任务被取消时通过这个信号让规划线程在下一个智能体步骤前停止
+                    cancel_event = threading.Event()
+
+                    def report_progress(agent: str, completed: int):
+                        """在规划线程中调用，把真实的智能体进度交给事件循环更新任务状态"""
+                        agent_name = AGENT_DISPLAY_NAMES.get(agent, agent)
+                        loop.call_soon_threadsafe(functools.partial(
+                            update_task,
+                            task_id,
+                            current_agent=agent_name,
+                            # 60%~95% 按已完成分析的专业智能体数量推进
+                            progress=60 + 35 * min(completed, len(SPECIALIST_AGENTS)) // len(SPECIALIST_AGENTS),
+                            message=f"{agent_name}正在协作规划..."
+                        ))
+
+                    try:
+                        # 等待最多4分钟；超时后 wait_for 会取消尚未开始执行的线程池任务，
+                        # 已在运行的线程收到取消信号后停止，不再继续调用大模型
+                        result = await asyncio.wait_for(
+                            loop.run_in_executor(
+                                planning_executor, travel_agents.run_travel_planning,
+                                langgraph_request, cancel_event, report_progress
+                            ),
+                            timeout=240
+                        )
+                        print(f"任务 {task_id}: LangGraph执行完成，结果: {result.get('success', False)}")
+                        # 只缓存完整的多智能体规划结果，简化版的备选结果不写入缓存
+                        if plan_cache is not None and result.get("success"):
+                            await asyncio.to_thread(plan_cache.put, plan_cache_key(langgraph_request), json_dumps(result))
+                        return result
+                    except asyncio.CancelledError:
+                        # 外层的5分钟超时取消了整个任务
+                        cancel_event.set()
+                        raise
+                    except asyncio.TimeoutError:
+                        cancel_event.set()
+                        print(f"任务 {task_id}: LangGraph执行超时，尝试使用简化版本")
+                        update_task(task_id, progress=80, message="LangGraph超时，使用简化版本...")
+
+                        # 使用简化版本作为备选方案；在单独的备选线程池中执行，
+                        # 避免同步的大模型调用阻塞事件循环，也不必等待规划线程池空出线程
+                        simple_agent = await get_simple_agent()
+                        return await loop.run_in_executor(
+                            fallback_executor, simple_agent.run_travel_planning, langgraph_request
+                        )
+
+                    except Exception as e:
+                        print(f"任务 {task_id}: LangGraph执行异常: {str(e)}，尝试使用简化版本")
+                        update_task(task_id, progress=80, message="LangGraph异常，使用简化版本...")
+
+                        # 使用简化版本作为备选方案；在单独的备选线程池中执行，
+                        # 避免同步的大模型调用阻塞事件循环，也不必等待规划线程池空出线程
+                        simple_agent = await get_simple_agent()
+                        return await loop.run_in_executor(
+                            fallback_executor, simple_agent.run_travel_planning, langgraph_request
+                        )
 
                 except Exception as e:
                     print(f"任务 {task_id}: 初始化LangGraph失败: {str(e)}")
@@ -265,155 +759,139 @@ async def run_planning_task(task_id: str, travel_request: Dict[str, Any]):
             print(f"任务 {task_id}: LangGraph处理完成")
             
             if result["success"]:
-                planning_tasks[task_id]["status"] = "completed"
-                planning_tasks[task_id]["progress"] = 100
-                planning_tasks[task_id]["message"] = "旅行规划完成！"
-                planning_tasks[task_id]["result"] = result
-
-                # 保存任务状态
-                save_tasks_state()
-                
-                # 保存结果到文件
-                await save_planning_result(task_id, result, langgraph_request)
+                # 先保存结果文件，再把任务标记为完成
+                await complete_planning_task(task_id, result, langgraph_request, "旅行规划完成！")
                 
             else:
-                planning_tasks[task_id]["status"] = "failed"
-                planning_tasks[task_id]["message"] = f"规划失败: {result.get('error', '未知错误')}"
+                update_task(task_id, status="failed", message=f"规划失败: {result.get('error', '未知错误')}")
                 
         except asyncio.TimeoutError:
             print(f"任务 {task_id}: LangGraph处理超时")
             # 超时处理，提供简化响应
-            simplified_result = {
-                "success": True,
-                "travel_plan": {
-                    "destination": travel_request["destination"],
-                    "duration": travel_request.get("duration", 7),
-                    "budget_range": travel_request["budget_range"],
-                    "group_size": travel_request["group_size"],
-                    "travel_dates": f"{travel_request['start_date']} 至 {travel_request['end_date']}",
-                    "summary": f"为{travel_request['destination']}制定的{travel_request.get('duration', 7)}天旅行计划（快速模式）"
-                },
-                "agent_outputs": {
-                    "system_message": {
-                        "response": f"由于系统负载较高，为您提供快速旅行计划。目的地：{travel_request['destination']}，预算：{travel_request['budget_range']}，人数：{travel_request['group_size']}人。建议您关注当地的热门景点、特色美食和文化体验。",
-                        "timestamp": datetime.now().isoformat(),
-                        "status": "completed"
-                    }
-                },
-                "total_iterations": 1,
-                "planning_complete": True
-            }
+            simplified_result = _build_fallback_result(travel_request, "timeout")
             
-            planning_tasks[task_id]["status"] = "completed"
-            planning_tasks[task_id]["progress"] = 100
-            planning_tasks[task_id]["message"] = "旅行规划完成（快速模式）"
-            planning_tasks[task_id]["result"] = simplified_result
-            
-            # 保存简化结果
-            await save_planning_result(task_id, simplified_result, langgraph_request)
+            # 保存简化结果并把任务标记为完成
+            await complete_planning_task(
+                task_id, simplified_result, langgraph_request, _FALLBACK_MODES["timeout"]["task_message"]
+            )
                 
         except Exception as agent_error:
             # 如果AI旅行规划智能体出错，提供一个简化的响应
             print(f"任务 {task_id}: AI旅行规划智能体错误: {str(agent_error)}")
             
             # 创建一个简化的旅行计划作为回退
-            simplified_result = {
-                "success": True,
-                "travel_plan": {
-                    "destination": travel_request["destination"],
-                    "duration": travel_request.get("duration", 7),
-                    "budget_range": travel_request["budget_range"],
-                    "group_size": travel_request["group_size"],
-                    "travel_dates": f"{travel_request['start_date']} 至 {travel_request['end_date']}",
-                    "summary": f"为{travel_request['destination']}制定的{travel_request.get('duration', 7)}天旅行计划"
-                },
-                "agent_outputs": {
-                    "system_message": {
-                        "response": f"系统正在维护中，为您提供基础的旅行计划框架。目的地：{travel_request['destination']}，预算：{travel_request['budget_range']}，人数：{travel_request['group_size']}人。建议提前了解当地的交通、住宿和主要景点信息。",
-                        "timestamp": datetime.now().isoformat(),
-                        "status": "completed"
-                    }
-                },
-                "total_iterations": 1,
-                "planning_complete": True
-            }
-            
-            planning_tasks[task_id]["status"] = "completed"
-            planning_tasks[task_id]["progress"] = 100
-            planning_tasks[task_id]["message"] = "旅行规划完成（简化模式）"
-            planning_tasks[task_id]["result"] = simplified_result
+            simplified_result = _build_fallback_result(travel_request, "error")
             
-            # 保存简化结果
-            await save_planning_result(task_id, simplified_result, langgraph_request)
+            # 保存简化结果并把任务标记为完成
+            await complete_planning_task(
+                task_id, simplified_result, langgraph_request, _FALLBACK_MODES["error"]["task_message"]
+            )
             
         print(f"任务 {task_id}: 执行完成")
             
     except Exception as e:
-        planning_tasks[task_id]["status"] = "failed"
-        planning_tasks[task_id]["message"] = f"系统错误: {str(e)}"
+        update_task(task_id, status="failed", message=f"系统错误: {str(e)}")
         print(f"任务 {task_id}: 规划任务执行错误: {str(e)}")
 
-async def save_planning_result(task_id: str, result: Dict[str, Any], request: Dict[str, Any]):
-    """保存规划结果到文件"""
+def _write_result_file(filepath: str, save_data: Dict[str, Any]) -> os.stat_result:
+    """把规划结果序列化并写入文件，返回写入后的文件状态"""
+    with open(filepath, 'wb') as f:
+        f.write(json_dumps(save_data, indent=True))
+    return os.stat(filepath)
+
+async def save_planning_result(task_id: str, result: Any, request: Dict[str, Any]) -> Optional[str]:
+    """
+    保存规划结果到文件，返回结果文件名，写入失败时返回None
+
+    result 可以是结果字典，也可以是已经序列化好的JSON字节串（例如规划缓存中的结果），
+    字节串会直接嵌入结果文件，不再重新序列化。
+    """
     try:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         destination = request.get('destination', 'unknown').replace(' ', '_')
         filename = f"旅行计划_{destination}_{timestamp}.json"
-        filepath = os.path.join("results", filename)
-        
-        # 确保results目录存在
-        os.makedirs("results", exist_ok=True)
+        filepath = os.path.join(RESULTS_DIR, filename)
         
         # 保存为JSON格式
         save_data = {
             "task_id": task_id,
             "timestamp": datetime.now().isoformat(),
             "request": request,
-            "result": result
+            "result": json_fragment(result) if isinstance(result, bytes) else result
         }
         
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(save_data, f, ensure_ascii=False, indent=2)
-            
-        planning_tasks[task_id]["result_file"] = filename
+        # 序列化和写文件都在线程中执行，较大的规划结果也不会阻塞事件循环
+        # （任务完成后结果字典不会再被修改，可以安全地在线程中读取）
+        # 记录写入时的文件状态，下载时无需再检查和stat文件
+        result_file_stats[task_id] = await asyncio.to_thread(_write_result_file, filepath, save_data)
+        return filename
         
     except Exception as e:
         print(f"保存结果文件时出错: {str(e)}")
+        return None
+
+async def complete_planning_task(task_id: str, result: Any, request: Dict[str, Any], message: str):
+    """
+    保存规划结果并把任务标记为完成
+
+    先写结果文件，再只把文件名写入任务记录：完整结果不会进入待写入的任务变更，
+    写文件期间触发的日志刷新也不会把整个规划结果序列化到任务日志中。
+    结果文件写入失败时把结果保留在内存中。
+    """
+    filename = await save_planning_result(task_id, result, request)
+    if filename is not None:
+        update_task(task_id, status="completed", progress=100, message=message, result_file=filename)
+    else:
+        update_task(
+            task_id, status="completed", progress=100, message=message,
+            result=json_loads(result) if isinstance(result, bytes) else result
+        )
+
+def load_planning_result(filename: str) -> Optional[Dict[str, Any]]:
+    """从结果文件读取规划结果，文件不存在时返回None"""
+    filepath = os.path.join(RESULTS_DIR, filename)
+    if not os.path.exists(filepath):
+        return None
+    with open(filepath, 'rb') as f:
+        return json_loads(f.read())["result"]
 
 @app.post("/plan", response_model=PlanningResponse)
-async def create_travel_plan(request: TravelRequest, background_tasks: BackgroundTasks):
+async def create_travel_plan(request: TravelRequest):
     """创建旅行规划任务"""
     try:
         # 生成任务ID
         task_id = str(uuid.uuid4())
         
-        # 计算旅行天数
-        from datetime import datetime
-        start_date = datetime.strptime(request.start_date, "%Y-%m-%d")
-        end_date = datetime.strptime(request.end_date, "%Y-%m-%d")
-        duration = (end_date - start_date).days + 1
-        
-        # 转换请求为字典
-        travel_request = request.model_dump()
-        travel_request["duration"] = duration
+        # 转换请求为字典（包含旅行天数）
+        travel_request = request.to_travel_request()
         
         # 初始化任务状态
-        planning_tasks[task_id] = {
-            "task_id": task_id,
-            "status": "started",
-            "progress": 0,
-            "current_agent": "系统初始化",
-            "message": "任务已创建，准备开始规划...",
-            "created_at": datetime.now().isoformat(),
-            "request": travel_request,
-            "result": None
-        }
+        add_task(TaskRecord(
+            task_id=task_id,
+            status="started",
+            progress=0,
+            current_agent="系统初始化",
+            message="任务已创建，准备开始规划...",
+            created_at=datetime.now().isoformat(),
+            request=travel_request
+        ))
+
+        # 相同需求已有未过期的规划结果时直接完成任务，不再启动智能体
+        if plan_cache is not None:
+            langgraph_request = build_langgraph_request(travel_request)
+            cached = await asyncio.to_thread(plan_cache.get, plan_cache_key(langgraph_request))
+            if cached is not None:
+                # 缓存中的结果直接写入结果文件，/status 查询时再从文件读取
+                await complete_planning_task(task_id, cached, langgraph_request, "旅行规划完成（复用缓存结果）")
 
-        # 保存任务状态
-        save_tasks_state()
+                return PlanningResponse(
+                    task_id=task_id,
+                    status="completed",
+                    message="已找到相同需求的旅行规划，直接返回结果"
+                )
         
-        # 添加后台任务
-        background_tasks.add_task(run_planning_task, task_id, travel_request)
+        # 放入规划队列，由后台worker执行
+        enqueue_planning(functools.partial(run_planning_task, task_id, travel_request))
         
         return PlanningResponse(
             task_id=task_id,
@@ -424,9 +902,43 @@ async def create_travel_plan(request: TravelRequest, background_tasks: Backgroun
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"创建规划任务失败: {str(e)}")
 
+async def _task_status_body(task_id: str, slim: bool = False) -> bytes:
+    """
+    返回任务状态的JSON响应内容，优先使用预序列化的缓存
+
+    slim 为 True 时结果只包含旅行计划和完成标志，省略各智能体的详细输出。
+    """
+    body = _task_status_cache.get((task_id, slim))
+    if body is not None:
+        return body
+
+    task = planning_tasks[task_id]
+    result = task.result
+    if result is None and task.result_file is not None:
+        result = await asyncio.to_thread(load_planning_result, task.result_file)
+    if slim and result is not None:
+        result = {
+            "travel_plan": result.get("travel_plan"),
+            "planning_complete": result.get("planning_complete")
+        }
+
+    # 字段与 PlanningStatus 一致；直接构造字典，避免Pydantic逐层校验并复制整个规划结果
+    body = json_dumps({
+        "task_id": task_id,
+        "status": task.status,
+        "progress": task.progress,
+        "current_agent": task.current_agent,
+        "message": task.message,
+        "result": result
+    })
+    # 结果保存在文件中的任务不缓存完整响应，避免完整结果重新常驻内存
+    if slim or task.result_file is None:
+        _task_status_cache[(task_id, slim)] = body
+    return body
+
 @app.get("/status/{task_id}", response_model=PlanningStatus)
-async def get_planning_status(task_id: str):
-    """获取规划任务状态"""
+async def get_planning_status(task_id: str, slim: bool = False):
+    """获取规划任务状态（slim=true 时省略各智能体的详细输出）"""
     try:
         print(f"状态查询: {task_id}")
 
@@ -435,22 +947,44 @@ async def get_planning_status(task_id: str):
             raise HTTPException(status_code=404, detail="任务不存在")
 
         task = planning_tasks[task_id]
-        print(f"任务状态: {task['status']}, 进度: {task['progress']}%")
+        print(f"任务状态: {task.status}, 进度: {task.progress}%")
 
-        return PlanningStatus(
-            task_id=task_id,
-            status=task["status"],
-            progress=task["progress"],
-            current_agent=task["current_agent"],
-            message=task["message"],
-            result=task["result"]
-        )
+        return Response(content=await _task_status_body(task_id, slim), media_type="application/json")
     except HTTPException:
         raise
     except Exception as e:
         print(f"状态查询错误: {str(e)}")
         raise HTTPException(status_code=500, detail=f"状态查询失败: {str(e)}")
 
+# 状态流没有变化时发送心跳的间隔（秒），防止代理服务器断开空闲连接
+STATUS_STREAM_KEEPALIVE = 15
+
+@app.get("/status/{task_id}/stream")
+async def stream_planning_status(task_id: str, slim: bool = False):
+    """
+    以Server-Sent Events方式推送任务状态
+
+    连接建立后立即发送一次当前状态，之后每次任务变化都推送最新状态，
+    任务完成或失败后关闭连接。客户端无需反复轮询 /status/{task_id}。
+    """
+    if task_id not in planning_tasks:
+        raise HTTPException(status_code=404, detail="任务不存在")
+
+    async def event_stream():
+        while task_id in planning_tasks:
+            # 先登记等待的事件再读取状态，读取之后发生的变化一定会唤醒下面的等待
+            event = _task_events.setdefault(task_id, asyncio.Event())
+            yield b"data: " + await _task_status_body(task_id, slim) + b"\n\n"
+            if planning_tasks[task_id].status in _FINISHED_STATUSES:
+                break
+            while not event.is_set():
+                try:
+                    await asyncio.wait_for(event.wait(), timeout=STATUS_STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
 @app.get("/download/{task_id}")
 async def download_result(task_id: str):
     """下载规划结果文件"""
@@ -458,90 +992,89 @@ async def download_result(task_id: str):
         raise HTTPException(status_code=404, detail="任务不存在")
     
     task = planning_tasks[task_id]
-    if "result_file" not in task:
+    if task.result_file is None:
         raise HTTPException(status_code=404, detail="结果文件不存在")
     
-    filepath = os.path.join("results", task["result_file"])
-    if not os.path.exists(filepath):
-        raise HTTPException(status_code=404, detail="文件不存在")
+    filepath = os.path.join(RESULTS_DIR, task.result_file)
+    stat_result = result_file_stats.get(task_id)
+    if stat_result is None:
+        # 服务重启后没有缓存的文件状态，读取一次并缓存，之后的下载不再访问文件系统元数据
+        try:
+            stat_result = os.stat(filepath)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="文件不存在")
+        result_file_stats[task_id] = stat_result
     
+    # 结果文件写入后不会再修改，允许浏览器在一小时内直接使用本地缓存
     return FileResponse(
         path=filepath,
-        filename=task["result_file"],
-        media_type='application/json'
+        filename=task.result_file,
+        media_type='application/json',
+        stat_result=stat_result,
+        headers={"Cache-Control": "private, max-age=3600"}
     )
 
 @app.get("/tasks")
 async def list_tasks():
     """列出所有任务"""
-    return {
-        "tasks": [
-            {
-                "task_id": task_id,
-                "status": task["status"],
-                "created_at": task["created_at"],
-                "destination": task["request"].get("destination", "未知")
-            }
-            for task_id, task in planning_tasks.items()
-        ]
-    }
+    global _tasks_index_cache
+    if _tasks_index_cache is None:
+        _tasks_index_cache = json_dumps({
+            "tasks": [
+                {
+                    "task_id": task_id,
+                    "status": task.status,
+                    "created_at": task.created_at,
+                    "destination": task.request.get("destination", "未知")
+                }
+                for task_id, task in planning_tasks.items()
+            ]
+        })
+    return Response(content=_tasks_index_cache, media_type="application/json")
 
 @app.post("/simple-plan")
-async def simple_travel_plan(request: TravelRequest, background_tasks: BackgroundTasks):
+async def simple_travel_plan(request: TravelRequest):
     """简化版旅行规划（使用简化智能体）"""
     try:
         # 生成任务ID
         task_id = str(uuid.uuid4())
 
-        # 计算旅行天数
-        from datetime import datetime
-        start_date = datetime.strptime(request.start_date, "%Y-%m-%d")
-        end_date = datetime.strptime(request.end_date, "%Y-%m-%d")
-        duration = (end_date - start_date).days + 1
-
-        # 转换请求为字典
-        travel_request = request.model_dump()
-        travel_request["duration"] = duration
+        # 转换请求为字典（包含旅行天数）
+        travel_request = request.to_travel_request()
 
         # 初始化任务状态
-        planning_tasks[task_id] = {
-            "task_id": task_id,
-            "status": "started",
-            "progress": 0,
-            "current_agent": "简化智能体",
-            "message": "任务已创建，准备开始简化规划...",
-            "created_at": datetime.now().isoformat(),
-            "request": travel_request,
-            "result": None
-        }
+        add_task(TaskRecord(
+            task_id=task_id,
+            status="started",
+            progress=0,
+            current_agent="简化智能体",
+            message="任务已创建，准备开始简化规划...",
+            created_at=datetime.now().isoformat(),
+            request=travel_request
+        ))
 
-        # 添加后台任务
+        # 放入规划队列，由后台worker执行
         async def run_simple_planning():
             try:
-                planning_tasks[task_id]["status"] = "processing"
-                planning_tasks[task_id]["progress"] = 30
-                planning_tasks[task_id]["message"] = "正在使用简化智能体规划..."
+                update_task(task_id, status="processing", progress=30, message="正在使用简化智能体规划...")
 
-                simple_agent = SimpleTravelAgent()
-                result = simple_agent.run_travel_planning(travel_request)
+                # 简化智能体的大模型调用是同步的，放到线程池中执行，避免阻塞事件循环和其他worker
+                simple_agent = await get_simple_agent()
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(
+                    planning_executor, simple_agent.run_travel_planning, travel_request
+                )
 
                 if result["success"]:
-                    planning_tasks[task_id]["status"] = "completed"
-                    planning_tasks[task_id]["progress"] = 100
-                    planning_tasks[task_id]["message"] = "简化规划完成！"
-                    planning_tasks[task_id]["result"] = result
-
-                    # 保存结果到文件
-                    await save_planning_result(task_id, result, travel_request)
+                    # 先保存结果文件，再把任务标记为完成
+                    await complete_planning_task(task_id, result, travel_request, "简化规划完成！")
                 else:
-                    planning_tasks[task_id]["status"] = "failed"
-                    planning_tasks[task_id]["message"] = f"简化规划失败: {result.get('error', '未知错误')}"
+                    update_task(task_id, status="failed", message=f"简化规划失败: {result.get('error', '未知错误')}")
 
             except Exception as e:
-                planning_tasks[task_id]["status"] = "failed"
-                planning_tasks[task_id]["message"] = f"简化规划异常: {str(e)}"
+                update_task(task_id, status="failed", message=f"简化规划异常: {str(e)}")
 
-        background_tasks.add_task(run_simple_planning)
+        enqueue_planning(run_simple_planning)
 
         return PlanningResponse(
             task_id=task_id,
@@ -561,18 +1094,10 @@ async def mock_travel_plan(request: TravelRequest):
 
         print(f"模拟任务 {task_id}: 开始")
 
-        # 计算旅行天数
-        from datetime import datetime
-        start_date = datetime.strptime(request.start_date, "%Y-%m-%d")
-        end_date = datetime.strptime(request.end_date, "%Y-%m-%d")
-        duration = (end_date - start_date).days + 1
-
-        # 转换请求为字典
-        travel_request = request.model_dump()
-        travel_request["duration"] = duration
+        # 转换请求为字典（包含旅行天数）
+        travel_request = request.to_travel_request()
 
         # 使用模拟智能体
-        mock_agent = MockTravelAgent()
         result = mock_agent.run_travel_planning(travel_request)
 
         print(f"模拟任务 {task_id}: 完成")
@@ -597,6 +1122,12 @@ if __name__ == "__main__":
         host="0.0.0.0",  # 监听所有接口
         port=8080,
         reload=False,  # 禁用热重载，避免任务数据丢失
+        # 任务状态、结果缓存和状态推送都保存在当前进程内存中，多个worker进程之间无法共享，
+        # 因此固定使用单进程；并发由事件循环和规划线程池提供
+        workers=1,
+        # uvicorn[standard] 已包含 uvloop 和 httptools，"auto" 会在可用时自动选用它们
+        loop="auto",
+        http="auto",
         log_level="info",
         timeout_keep_alive=30,  # 增加keep-alive超时
         timeout_graceful_shutdown=30,  # 优雅关闭超时
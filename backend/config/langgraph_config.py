@@ -50,11 +50,29 @@ class LangGraphConfig:
     HOTEL_SEARCH_ENABLED = True        # 启用酒店搜索
     RESTAURANT_SEARCH_ENABLED = True   # 启用餐厅搜索
 
+    # 规划结果缓存配置（目的地、日期、预算、人数和兴趣都相同的请求直接复用已有规划）
+    PLAN_CACHE_ENABLED = os.getenv("PLAN_CACHE_ENABLED", "true").lower() == "true"  # 是否启用缓存
+    PLAN_CACHE_FILE = "plan_cache.db"              # 缓存数据库文件
+    PLAN_CACHE_TTL = 7 * 24 * 3600                 # 缓存有效期（秒），默认7天
+    PLAN_CACHE_MAX_BYTES = 100 * 1024 * 1024       # 缓存总大小上限，默认100MB
+
     # 模型生成参数
     TEMPERATURE = 0.7    # 控制生成文本的随机性(0-1，越高越随机)
     MAX_TOKENS = 4000    # 最大生成token数
     TOP_P = 0.9         # 核采样参数，控制生成质量
-    
+
+    # 大模型请求限制：单次请求超时和重试次数都有上限，
+    # 避免一次缓慢的调用耗尽整个规划任务的时间预算
+    LLM_REQUEST_TIMEOUT = 30   # 单次请求超时时间（秒）
+    LLM_MAX_RETRIES = 2        # 失败后的最大重试次数
+
+    # 规划并发配置：规划主要在等待大模型接口，线程数与CPU核数无关。
+    # 线程池比同时执行的规划数多留出空闲线程：超时的规划线程要等当前的大模型调用结束才会退出，
+    # 这期间新的规划仍然有线程可用
+    PLANNING_CONCURRENCY = int(os.getenv("PLANNING_CONCURRENCY", "4"))                # 同时执行的规划任务数
+    PLANNING_THREAD_POOL_SIZE = int(os.getenv("PLANNING_THREAD_POOL_SIZE", "8"))      # 规划线程池大小
+    FALLBACK_THREAD_POOL_SIZE = int(os.getenv("FALLBACK_THREAD_POOL_SIZE", "4"))      # 简化版备选方案线程池大小
+
     @classmethod
     def get_gemini_config(cls) -> Dict[str, Any]:
         """
@@ -70,6 +88,8 @@ class LangGraphConfig:
             "temperature": cls.TEMPERATURE,
             "max_output_tokens": cls.MAX_TOKENS,
             "top_p": cls.TOP_P,
+            "timeout": cls.LLM_REQUEST_TIMEOUT,
+            "max_retries": cls.LLM_MAX_RETRIES,
         }
 
     @classmethod
@@ -13,12 +13,42 @@
 数据缓存、错误处理和用户友好的货币显示。
 """
 
-import requests
+import asyncio
+import httpx
 import json
+import requests
+import time
 from typing import Dict, Any, Optional, List
-from datetime import datetime, timedelta
+from datetime import date, datetime
 from ..config.api_config import api_config
 
+# 需要生成显示字符串的金额字段，以及对应的格式化字段名
+_AMOUNT_FIELDS = tuple(
+    (field, f"{field}_formatted")
+    for field in (
+        'accommodation_cost', 'food_cost', 'activities_cost',
+        'transportation_cost', 'miscellaneous_cost', 'total_cost',
+        'daily_budget', 'converted_total'
+    )
+)
+
+# 费用明细条目中需要换算的金额字段
+_BREAKDOWN_COST_KEYS = ('cost', 'estimated_cost')
+
+# 货币的英文名称（只读常量，不必在每次查询时重新创建）
+_CURRENCY_NAMES = {
+    'USD': 'US Dollar',
+    'EUR': 'Euro',
+    'GBP': 'British Pound',
+    'INR': 'Indian Rupee',
+    'JPY': 'Japanese Yen',
+    'CAD': 'Canadian Dollar',
+    'AUD': 'Australian Dollar',
+    'CHF': 'Swiss Franc',
+    'CNY': 'Chinese Yuan',
+    'SGD': 'Singapore Dollar'
+}
+
 class CurrencyConverter:
     """
     货币转换和汇率管理服务类
@@ -52,11 +82,17 @@ class CurrencyConverter:
         self.api_key = api_config.EXCHANGERATE_API_KEY  # 汇率API密钥
         self.base_url = api_config.EXCHANGE_RATE_URL    # API基础URL
         self.session = requests.Session()               # HTTP会话对象
+        self._async_session: Optional[httpx.AsyncClient] = None  # 异步HTTP客户端（首次异步查询时创建）
+        self._async_session_loop = None                # 创建异步客户端时所在的事件循环
 
         # 汇率缓存（避免频繁API调用）
-        self.rate_cache = {}                           # 汇率缓存字典
-        self.cache_timestamp = None                    # 缓存时间戳
-        self.cache_duration = timedelta(hours=1)       # 缓存有效期：1小时
+        # 每次刷新只以人民币为基准请求一次API，再换算出所有支持货币之间的交叉汇率
+        self.rate_base = 'CNY'                         # 请求API时使用的基准货币
+        self.base_rates = {}                           # 以基准货币表示的汇率（API原始数据）
+        self.base_rates_expires_at = 0.0               # 基准汇率的过期时间（time.monotonic()）
+        self.rate_cache = {}                           # 货币对汇率表：(源货币, 目标货币) -> (汇率, 过期时间)
+        self.cache_duration = 3600.0                   # 缓存有效期：1小时（秒）
+        self._inflight = {}                            # 正在进行的异步汇率请求：(事件循环, 基准货币) -> asyncio.Task
 
         # 回退汇率（近似值，定期更新）
         self.fallback_rates = {
@@ -85,7 +121,20 @@ class CurrencyConverter:
             'CHF': 'CHF',  # 瑞士法郎符号
             'SGD': 'S$'    # 新加坡元符号
         }
+
+        # 每种货币的金额格式化函数（预先拼好货币符号模板，例如 "$1,234.50"）
+        self._formatters = {
+            currency: f"{symbol}{{:,.2f}}".format
+            for currency, symbol in self.currency_symbols.items()
+        }
     
+    async def aclose(self):
+        """关闭异步HTTP客户端，释放底层连接池（应用关闭时调用）"""
+        if self._async_session is not None:
+            await self._async_session.aclose()
+            self._async_session = None
+            self._async_session_loop = None
+
     def get_exchange_rate(self, from_currency: str = 'CNY', to_currency: str = 'CNY') -> float:
         """
         获取两种货币之间的汇率
@@ -110,30 +159,72 @@ class CurrencyConverter:
         """
         if from_currency == to_currency:
             return 1.0
-        
+
         try:
-            # 首先检查缓存
-            if self._is_cache_valid():
-                rate_key = f"{from_currency}_{to_currency}"
-                if rate_key in self.rate_cache:
-                    return self.rate_cache[rate_key]
+            # 首先检查缓存和仍然有效的基准汇率
+            rate = self._lookup_rate(from_currency, to_currency)
+            if rate is not None:
+                return rate
+
+            # 获取最新汇率（一次请求即可覆盖所有货币对）
+            rates = self._fetch_exchange_rates(self.rate_base)
+            if rates:
+                self._update_cache(rates)
+                rate = self._derive_rate(from_currency, to_currency)
+                if rate is not None:
+                    return rate
+
+            # 回退到存储的汇率
+            return self._get_fallback_rate(from_currency, to_currency)
+
+        except Exception as e:
+            print(f"获取汇率时出错: {e}")
+            return self._get_fallback_rate(from_currency, to_currency)
+
+    async def get_exchange_rate_async(self, from_currency: str = 'CNY', to_currency: str = 'CNY') -> float:
+        """
+        get_exchange_rate 的异步版本
 
-            # 获取最新汇率
-            rates = self._fetch_exchange_rates(from_currency)
-            if rates and to_currency in rates:
-                rate = rates[to_currency]
+        在异步代码中使用，等待汇率API响应时不会阻塞事件循环；
+        缓存过期时多个并发查询共用同一个API请求。
 
-                # 更新缓存
-                self._update_cache(from_currency, rates)
+        参数：
+        - from_currency: 源货币代码（默认：CNY）
+        - to_currency: 目标货币代码（默认：CNY）
 
+        返回：汇率（浮点数）
+        """
+        if from_currency == to_currency:
+            return 1.0
+
+        try:
+            # 首先检查缓存和仍然有效的基准汇率
+            rate = self._lookup_rate(from_currency, to_currency)
+            if rate is not None:
                 return rate
 
+            # 获取最新汇率（一次请求即可覆盖所有货币对）
+            if await self._refresh_rates(self.rate_base):
+                rate = self._derive_rate(from_currency, to_currency)
+                if rate is not None:
+                    return rate
+
             # 回退到存储的汇率
             return self._get_fallback_rate(from_currency, to_currency)
 
         except Exception as e:
             print(f"获取汇率时出错: {e}")
             return self._get_fallback_rate(from_currency, to_currency)
+
+    def _lookup_rate(self, from_currency: str, to_currency: str) -> Optional[float]:
+        """从汇率表或仍然有效的基准汇率中取得汇率，都没有时返回None"""
+        # 一次字典查找同时取得汇率和过期时间
+        entry = self.rate_cache.get((from_currency, to_currency))
+        if entry is not None and entry[1] > time.monotonic():
+            return entry[0]
+
+        # 表中没有的货币对，尝试用仍然有效的基准汇率换算
+        return self._derive_rate(from_currency, to_currency)
     
     def convert_amount(self, amount: float, from_currency: str = 'CNY', to_currency: str = 'CNY') -> float:
         """
@@ -156,9 +247,15 @@ class CurrencyConverter:
             return 0.0
 
         rate = self.get_exchange_rate(from_currency, to_currency)
-        converted_amount = amount * rate
+        return self._apply_rate(amount, rate)
+
+    async def convert_amount_async(self, amount: float, from_currency: str = 'CNY', to_currency: str = 'CNY') -> float:
+        """convert_amount 的异步版本，汇率通过 get_exchange_rate_async 获取"""
+        if amount <= 0:
+            return 0.0
 
-        return round(converted_amount, 2)
+        rate = await self.get_exchange_rate_async(from_currency, to_currency)
+        return self._apply_rate(amount, rate)
     
     def convert_expenses(self, expense_breakdown: Dict[str, Any], target_currency: str) -> Dict[str, Any]:
         """
@@ -189,57 +286,78 @@ class CurrencyConverter:
         
         try:
             conversion_rate = self.get_exchange_rate(base_currency, target_currency)
-            
-            converted_expenses = {
-                'base_currency': base_currency,                                    # 基础货币
-                'target_currency': target_currency,                               # 目标货币
-                'conversion_rate': conversion_rate,                               # 转换汇率
-                'converted_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),   # 转换日期
-                'original_total': expense_breakdown.get('total_cost', 0),         # 原始总额
-                'converted_total': 0                                              # 转换后总额
-            }
-
-            # 转换所有费用类别
-            categories_to_convert = [
-                'accommodation_cost',    # 住宿费用
-                'food_cost',            # 餐饮费用
-                'activities_cost',      # 活动费用
-                'transportation_cost',  # 交通费用
-                'miscellaneous_cost',   # 杂项费用
-                'total_cost'           # 总费用
-            ]
-            
-            for category in categories_to_convert:
-                if category in expense_breakdown:
-                    original_amount = expense_breakdown[category]
-                    converted_amount = self.convert_amount(original_amount, base_currency, target_currency)
-                    converted_expenses[category] = converted_amount
-                    
-                    if category == 'total_cost':
-                        converted_expenses['converted_total'] = converted_amount
-            
-            # 转换每日预算（如果可用）
-            if 'daily_budget' in expense_breakdown:
-                converted_expenses['daily_budget'] = self.convert_amount(
-                    expense_breakdown['daily_budget'], base_currency, target_currency
-                )
-
-            # 添加详细分解（如果可用）
-            if 'detailed_breakdown' in expense_breakdown:
-                converted_expenses['detailed_breakdown'] = self._convert_detailed_breakdown(
-                    expense_breakdown['detailed_breakdown'], base_currency, target_currency
-                )
-
-            # 添加货币格式化
-            converted_expenses = self._add_currency_formatting(converted_expenses, target_currency)
-
-            return converted_expenses
+            return self._convert_expenses_with_rate(expense_breakdown, base_currency, target_currency, conversion_rate)
 
         except Exception as e:
             print(f"转换费用时出错: {e}")
             # 返回带货币格式化的原始数据
             return self._add_currency_formatting(expense_breakdown, base_currency)
-    
+
+    async def convert_expenses_async(self, expense_breakdown: Dict[str, Any], target_currency: str) -> Dict[str, Any]:
+        """convert_expenses 的异步版本，汇率通过 get_exchange_rate_async 获取"""
+        base_currency = expense_breakdown.get('base_currency', 'CNY')
+
+        if base_currency == target_currency:
+            # 添加货币符号并返回
+            return self._add_currency_formatting(expense_breakdown, target_currency)
+
+        try:
+            conversion_rate = await self.get_exchange_rate_async(base_currency, target_currency)
+            return self._convert_expenses_with_rate(expense_breakdown, base_currency, target_currency, conversion_rate)
+
+        except Exception as e:
+            print(f"转换费用时出错: {e}")
+            # 返回带货币格式化的原始数据
+            return self._add_currency_formatting(expense_breakdown, base_currency)
+
+    def _convert_expenses_with_rate(self, expense_breakdown: Dict[str, Any], base_currency: str,
+                                    target_currency: str, conversion_rate: float) -> Dict[str, Any]:
+        """用已经取得的汇率转换完整的费用明细"""
+        converted_expenses = {
+            'base_currency': base_currency,                                    # 基础货币
+            'target_currency': target_currency,                               # 目标货币
+            'conversion_rate': conversion_rate,                               # 转换汇率
+            'converted_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),   # 转换日期
+            'original_total': expense_breakdown.get('total_cost', 0),         # 原始总额
+            'converted_total': 0                                              # 转换后总额
+        }
+
+        # 转换所有费用类别
+        categories_to_convert = [
+            'accommodation_cost',    # 住宿费用
+            'food_cost',            # 餐饮费用
+            'activities_cost',      # 活动费用
+            'transportation_cost',  # 交通费用
+            'miscellaneous_cost',   # 杂项费用
+            'total_cost'           # 总费用
+        ]
+        
+        # 汇率在本次转换中固定不变，直接用同一个汇率一次性换算所有类别
+        apply_rate = self._apply_rate
+        converted_categories = {
+            category: apply_rate(expense_breakdown[category], conversion_rate)
+            for category in categories_to_convert
+            if category in expense_breakdown
+        }
+        converted_expenses.update(converted_categories)
+        if 'total_cost' in converted_categories:
+            converted_expenses['converted_total'] = converted_categories['total_cost']
+        
+        # 转换每日预算（如果可用）
+        if 'daily_budget' in expense_breakdown:
+            converted_expenses['daily_budget'] = apply_rate(expense_breakdown['daily_budget'], conversion_rate)
+
+        # 添加详细分解（如果可用）
+        if 'detailed_breakdown' in expense_breakdown:
+            converted_expenses['detailed_breakdown'] = self._convert_detailed_breakdown(
+                expense_breakdown['detailed_breakdown'], conversion_rate
+            )
+
+        # 添加货币格式化
+        converted_expenses = self._add_currency_formatting(converted_expenses, target_currency)
+
+        return converted_expenses
+
     def _fetch_exchange_rates(self, base_currency: str) -> Optional[Dict[str, float]]:
         """
         从API获取汇率数据
@@ -260,12 +378,7 @@ class CurrencyConverter:
         包括错误处理和多种API格式的支持。
         """
         try:
-            if self.api_key:
-                # 如果有API密钥，使用付费API
-                url = f"https://v6.exchangerate-api.com/v6/{self.api_key}/latest/{base_currency}"
-            else:
-                # 使用免费API
-                url = f"{self.base_url}/{base_currency}"
+            url = self._rates_url(base_currency)
 
             response = self.session.get(url, timeout=10)
             response.raise_for_status()
@@ -282,6 +395,82 @@ class CurrencyConverter:
             print(f"获取汇率失败: {e}")
             return None
     
+    async def _fetch_exchange_rates_async(self, base_currency: str) -> Optional[Dict[str, float]]:
+        """
+        _fetch_exchange_rates 的异步版本，使用当前事件循环的 httpx.AsyncClient
+
+        参数：
+        - base_currency: 基础货币代码
+
+        返回：汇率字典或None（如果失败）
+        """
+        try:
+            url = self._rates_url(base_currency)
+            response = await self._get_async_session().get(url)
+            response.raise_for_status()
+            data = response.json()
+
+            if 'rates' in data:
+                return data['rates']
+            elif 'conversion_rates' in data:  # 不同的API格式
+                return data['conversion_rates']
+
+            return None
+
+        except Exception as e:
+            print(f"获取汇率失败: {e}")
+            return None
+
+    def _rates_url(self, base_currency: str) -> str:
+        """构造汇率API的请求地址：有API密钥时使用付费API，否则使用免费API"""
+        if self.api_key:
+            return f"https://v6.exchangerate-api.com/v6/{self.api_key}/latest/{base_currency}"
+        return f"{self.base_url}/{base_currency}"
+
+    def _get_async_session(self) -> httpx.AsyncClient:
+        """
+        返回当前事件循环使用的异步HTTP客户端
+
+        httpx.AsyncClient 的连接绑定在创建它的事件循环上，
+        在另一个事件循环中使用时重新创建客户端。
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_session is None or self._async_session_loop is not loop:
+            self._async_session = httpx.AsyncClient(timeout=10.0)
+            self._async_session_loop = loop
+        return self._async_session
+    
+    async def _refresh_rates(self, base_currency: str) -> bool:
+        """
+        异步刷新汇率缓存，同一基准货币同一时间只发出一个API请求
+
+        缓存过期时可能有多个规划任务同时查询汇率。第一个调用者发起请求，
+        其余调用者等待同一个请求的结果，而不是各自再请求一次API。
+
+        参数：
+        - base_currency: 基础货币代码
+
+        返回：是否成功获取并更新了汇率
+        """
+        # 请求任务只能在创建它的事件循环中等待，因此按事件循环分别记录
+        key = (asyncio.get_running_loop(), base_currency)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch_and_update(base_currency))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        # shield：某个等待者被取消时，不影响其他等待同一请求的调用者
+        return await asyncio.shield(task)
+
+    async def _fetch_and_update(self, base_currency: str) -> bool:
+        """Fetch rates for base_currency and store them in the cache"""
+        rates = await self._fetch_exchange_rates_async(base_currency)
+        if not rates:
+            return False
+        self._update_cache(rates)
+        return True
+
     def _get_fallback_rate(self, from_currency: str, to_currency: str) -> float:
         """
         使用回退汇率获取汇率
@@ -319,49 +508,74 @@ class CurrencyConverter:
         except Exception:
             return 1.0  # 安全回退值
     
-    def _is_cache_valid(self) -> bool:
-        """Check if cached exchange rates are still valid"""
-        if not self.cache_timestamp:
-            return False
-        
-        return datetime.now() - self.cache_timestamp < self.cache_duration
-    
-    def _update_cache(self, base_currency: str, rates: Dict[str, float]):
-        """Update exchange rate cache"""
-        self.cache_timestamp = datetime.now()
-        
-        # Store rates with base currency prefix
-        for currency, rate in rates.items():
-            cache_key = f"{base_currency}_{currency}"
-            self.rate_cache[cache_key] = rate
-    
-    def _convert_detailed_breakdown(self, detailed_breakdown: Dict, from_currency: str, to_currency: str) -> Dict:
-        """Convert detailed expense breakdown"""
+    def _update_cache(self, rates: Dict[str, float]):
+        """Update exchange rate cache and rebuild the cross-rate table for supported currencies"""
+        expires_at = time.monotonic() + self.cache_duration
+        self.base_rates = rates
+        self.base_rates_expires_at = expires_at
+
+        # rates[x] 表示 1 单位基准货币可兑换的 x，因此 a→b 的汇率为 rates[b] / rates[a]
+        supported = [currency for currency in self.fallback_rates if rates.get(currency)]
+        self.rate_cache = {
+            (from_currency, to_currency): (rates[to_currency] / rates[from_currency], expires_at)
+            for from_currency in supported
+            for to_currency in supported
+        }
+
+    def _derive_rate(self, from_currency: str, to_currency: str) -> Optional[float]:
+        """Derive a pair's rate from still-valid base rates and add it to the table"""
+        if self.base_rates_expires_at <= time.monotonic():
+            return None
+
+        from_rate = self.base_rates.get(from_currency)
+        to_rate = self.base_rates.get(to_currency)
+        if not from_rate or to_rate is None:
+            return None
+
+        rate = to_rate / from_rate
+        self.rate_cache[(from_currency, to_currency)] = (rate, self.base_rates_expires_at)
+        return rate
+
+    @staticmethod
+    def _apply_rate(amount: float, rate: float) -> float:
+        """Convert a single amount with a known rate (same rules as convert_amount)"""
+        if amount <= 0:
+            return 0.0
+        # 先换算成整数“分”再四舍五入（四舍五入到分，而不是round()的银行家舍入），最后转回元
+        return int(amount * rate * 100 + 0.5) / 100
+
+    def _convert_detailed_breakdown(self, detailed_breakdown: Dict, rate: float) -> Dict:
+        """Convert detailed expense breakdown with a single, already-resolved rate"""
         converted_breakdown = {}
+        apply_rate = self._apply_rate
         
         for category, items in detailed_breakdown.items():
             if isinstance(items, list):
-                converted_items = []
-                for item in items:
-                    if isinstance(item, dict) and 'cost' in item:
-                        converted_item = item.copy()
-                        converted_item['cost'] = self.convert_amount(
-                            item['cost'], from_currency, to_currency
-                        )
-                        converted_items.append(converted_item)
-                    else:
-                        converted_items.append(item)
-                converted_breakdown[category] = converted_items
+                converted_breakdown[category] = [
+                    self._convert_breakdown_item(item, rate) if isinstance(item, dict) else item
+                    for item in items
+                ]
             elif isinstance(items, (int, float)):
-                converted_breakdown[category] = self.convert_amount(items, from_currency, to_currency)
+                converted_breakdown[category] = apply_rate(items, rate)
             else:
                 converted_breakdown[category] = items
         
         return converted_breakdown
     
+    def _convert_breakdown_item(self, item: Dict[str, Any], rate: float) -> Dict[str, Any]:
+        """Convert the cost fields ('cost' / 'estimated_cost') of a single breakdown item"""
+        converted_item = item
+        for key in _BREAKDOWN_COST_KEYS:
+            if key in item:
+                if converted_item is item:
+                    converted_item = item.copy()
+                converted_item[key] = self._apply_rate(item[key], rate)
+        return converted_item
+    
     def _add_currency_formatting(self, expenses: Dict[str, Any], currency: str) -> Dict[str, Any]:
         """Add currency symbols and formatting to expense dictionary"""
         symbol = self.currency_symbols.get(currency, currency)
+        fmt = self._get_formatter(currency)
         formatted_expenses = expenses.copy()
         
         # Add currency info
@@ -369,18 +583,19 @@ class CurrencyConverter:
         formatted_expenses['currency_code'] = currency
         
         # Add formatted strings for display
-        amount_fields = [
-            'accommodation_cost', 'food_cost', 'activities_cost',
-            'transportation_cost', 'miscellaneous_cost', 'total_cost',
-            'daily_budget', 'converted_total'
-        ]
-        
-        for field in amount_fields:
-            if field in formatted_expenses and isinstance(formatted_expenses[field], (int, float)):
-                amount = formatted_expenses[field]
-                formatted_expenses[f"{field}_formatted"] = f"{symbol}{amount:,.2f}"
+        for field, formatted_field in _AMOUNT_FIELDS:
+            amount = expenses.get(field)
+            if isinstance(amount, (int, float)):
+                formatted_expenses[formatted_field] = fmt(amount)
         
         return formatted_expenses
+
+    def _get_formatter(self, currency: str):
+        """Return the amount formatter for a currency, using the code as symbol when unknown"""
+        fmt = self._formatters.get(currency)
+        if fmt is None:
+            fmt = self._formatters[currency] = f"{currency}{{:,.2f}}".format
+        return fmt
     
     def get_supported_currencies(self) -> List[str]:
         """Get list of supported currencies"""
@@ -388,34 +603,30 @@ class CurrencyConverter:
     
     def get_currency_info(self, currency_code: str) -> Dict[str, str]:
         """Get information about a currency"""
-        currency_names = {
-            'USD': 'US Dollar',
-            'EUR': 'Euro',
-            'GBP': 'British Pound',
-            'INR': 'Indian Rupee',
-            'JPY': 'Japanese Yen',
-            'CAD': 'Canadian Dollar',
-            'AUD': 'Australian Dollar',
-            'CHF': 'Swiss Franc',
-            'CNY': 'Chinese Yuan',
-            'SGD': 'Singapore Dollar'
-        }
-        
         return {
             'code': currency_code,
-            'name': currency_names.get(currency_code, currency_code),
+            'name': _CURRENCY_NAMES.get(currency_code, currency_code),
             'symbol': self.currency_symbols.get(currency_code, currency_code)
         }
     
     def format_amount(self, amount: float, currency: str) -> str:
         """Format amount with currency symbol"""
-        symbol = self.currency_symbols.get(currency, currency)
-        return f"{symbol}{amount:,.2f}"
+        return self._get_formatter(currency)(amount)
     
     def get_conversion_summary(self, from_currency: str, to_currency: str, amount: float = 1.0) -> Dict[str, Any]:
         """Get conversion summary with rate information"""
         rate = self.get_exchange_rate(from_currency, to_currency)
-        converted_amount = self.convert_amount(amount, from_currency, to_currency)
+        return self._build_conversion_summary(from_currency, to_currency, amount, rate)
+
+    async def get_conversion_summary_async(self, from_currency: str, to_currency: str, amount: float = 1.0) -> Dict[str, Any]:
+        """get_conversion_summary 的异步版本，汇率通过 get_exchange_rate_async 获取"""
+        rate = await self.get_exchange_rate_async(from_currency, to_currency)
+        return self._build_conversion_summary(from_currency, to_currency, amount, rate)
+
+    def _build_conversion_summary(self, from_currency: str, to_currency: str, amount: float, rate: float) -> Dict[str, Any]:
+        """用已经取得的汇率生成转换摘要"""
+        # 汇率已经取得，直接换算，不再经由 convert_amount 重复查询汇率
+        converted_amount = self._apply_rate(amount, rate)
         
         return {
             'from_currency': from_currency,
@@ -425,6 +636,6 @@ class CurrencyConverter:
             'converted_amount': converted_amount,
             'formatted_original': self.format_amount(amount, from_currency),
             'formatted_converted': self.format_amount(converted_amount, to_currency),
-            'rate_date': datetime.now().strftime('%Y-%m-%d'),
+            'rate_date': date.today().isoformat(),
             'rate_info': f"1 {from_currency} = {rate:.4f} {to_currency}"
         }
\ No newline at end of file
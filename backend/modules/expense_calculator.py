@@ -14,9 +14,58 @@
 包含多种费用类型的处理和预算范围的智能调整。
 """
 
-from typing import Dict, Any, List
+import math
+from itertools import chain, islice
+from typing import Dict, Any, Iterable, List
 from ..data.models import Hotel, Attraction, Transportation
 
+# 各预算范围的每晚房价区间（人民币），与 HotelEstimator 的价格范围一致
+_HOTEL_PRICE_RANGES = {
+    '经济型': (200, 560),
+    '中等预算': (560, 1400),
+    '豪华型': (1400, 3500)
+}
+
+# 省钱贴士规则：(费用类别, 占比阈值%, 超过阈值时给出的建议)
+_COST_SAVING_RULES = (
+    # 住宿费用优化建议
+    ('accommodation', 40, ("考虑入住经济型酒店或民宿以降低住宿成本",
+                           "选择市中心外围的酒店可获得更优惠的价格")),
+    # 餐饮费用优化建议
+    ('food', 35, ("尝试当地街头美食和市场，既正宗又经济实惠",
+                  "选择包含早餐的酒店可节省餐饮费用")),
+    # 活动费用优化建议
+    ('activities', 30, ("寻找免费的徒步游览和公共景点",
+                        "查看活动和景点的团体折扣优惠")),
+    # 交通费用优化建议
+    ('transportation', 20, ("尽可能使用公共交通而非出租车",
+                            "考虑购买多日城市交通通票")),
+)
+
+# 非经济型预算的通用建议
+_NON_BUDGET_TIPS = ("选择淡季出行可获得更优惠的价格", "提前预订住宿和活动可享受早鸟折扣")
+
+# 所有预算都适用的建议
+_GENERAL_TIPS = ("预留10-15%的预算用于意外支出", "使用旅行应用寻找优惠并比较价格")
+
+def _to_cents(amount: float) -> int:
+    """把金额（元）四舍五入为整数“分”"""
+    return math.floor(amount * 100 + 0.5)
+
+def _average_cost(items: Iterable[Attraction], limit: int) -> float:
+    """
+    计算前 limit 个项目的平均预估费用
+
+    一次遍历同时累加费用和计数，不需要先切片复制列表。
+    调用方保证 items 至少包含一个元素。
+    """
+    total = 0.0
+    count = 0
+    for item in islice(items, limit):
+        total += item.estimated_cost
+        count += 1
+    return total / count
+
 class ExpenseCalculator:
     """
     旅行费用计算服务类
@@ -54,6 +103,13 @@ class ExpenseCalculator:
             '豪华型': 1.5      # 豪华：费用较高
         }
 
+        # 预算范围之间的费用比例表：_budget_ratios[基准预算][目标预算] = 目标倍数 / 基准倍数
+        self._budget_ratios = {
+            base: {target: target_multiplier / base_multiplier
+                   for target, target_multiplier in self.budget_multipliers.items()}
+            for base, base_multiplier in self.budget_multipliers.items()
+        }
+
         # 每日交通费用估算（人民币）
         self.transportation_costs = {
             '经济型': 100,     # 公共交通、步行
@@ -67,6 +123,23 @@ class ExpenseCalculator:
             '中等预算': 280,   # 适度购物和娱乐
             '豪华型': 560      # 高端购物和服务
         }
+
+        # 缺少数据时的每日回退估算（人民币）：住宿为每晚，餐饮和活动为每人每天
+        fallback_costs = {
+            '经济型': {'accommodation': 280, 'food': 175, 'activities': 210},
+            '中等预算': {'accommodation': 700, 'food': 350, 'activities': 420},
+            '豪华型': {'accommodation': 1750, 'food': 700, 'activities': 840}
+        }
+
+        # 每个预算范围的全部每日费用标准合并为一张表，计算时只需查找一次
+        self.daily_costs = {
+            budget_range: {
+                **costs,
+                'transportation': self.transportation_costs[budget_range],
+                'miscellaneous': self.miscellaneous_costs[budget_range]
+            }
+            for budget_range, costs in fallback_costs.items()
+        }
     
     def calculate_total_expenses(self, trip_details: Dict[str, Any], hotels: List[Hotel],
                                attractions: List[Attraction], restaurants: List[Attraction],
@@ -98,26 +171,51 @@ class ExpenseCalculator:
         budget_range = trip_details.get('budget_range', '中等预算')     # 预算范围
         group_size = trip_details.get('group_size', 1)                # 团队人数
 
+        # 当前预算范围的每日费用标准（未知预算范围按中等预算计算）
+        daily_costs = self.daily_costs.get(budget_range, self.daily_costs['中等预算'])
+
         # 计算住宿费用
-        accommodation_cost = self._calculate_accommodation_cost(hotels, total_days, budget_range)
+        accommodation_cost = self._calculate_accommodation_cost(
+            hotels, total_days, budget_range, daily_costs['accommodation']
+        )
 
         # 计算餐饮费用
-        food_cost = self._calculate_food_cost(restaurants, total_days, group_size, budget_range)
+        food_cost = self._calculate_food_cost(restaurants, total_days, group_size, daily_costs['food'])
 
         # 计算活动费用（景点+活动）
-        activities_cost = self._calculate_activities_cost(attractions + activities, total_days, group_size, budget_range)
+        activities_cost = self._calculate_activities_cost(
+            attractions, activities, total_days, group_size, daily_costs['activities']
+        )
 
         # 计算交通费用
-        transportation_cost = self._calculate_transportation_cost(total_days, group_size, budget_range)
+        transportation_cost = self._calculate_transportation_cost(total_days, group_size, daily_costs['transportation'])
         
         # 计算杂项费用
-        miscellaneous_cost = self._calculate_miscellaneous_cost(total_days, group_size, budget_range)
+        miscellaneous_cost = self._calculate_miscellaneous_cost(total_days, group_size, daily_costs['miscellaneous'])
 
         # 计算总费用
         total_cost = (accommodation_cost + food_cost + activities_cost +
                      transportation_cost + miscellaneous_cost)
 
-        daily_budget = total_cost / total_days if total_days > 0 else 0
+        # 各项费用换算为整数“分”后再汇总：总额与各项显示金额之和完全一致，也没有浮点累加误差
+        accommodation_cents = _to_cents(accommodation_cost)
+        food_cents = _to_cents(food_cost)
+        activities_cents = _to_cents(activities_cost)
+        transportation_cents = _to_cents(transportation_cost)
+        miscellaneous_cents = _to_cents(miscellaneous_cost)
+        total_cents = (accommodation_cents + food_cents + activities_cents +
+                       transportation_cents + miscellaneous_cents)
+
+        daily_budget_cents = math.floor(total_cents / total_days + 0.5) if total_days > 0 else 0
+
+        # 人均费用：团队人数只检查一次
+        if group_size > 0:
+            cost_per_person = math.floor(total_cents / group_size + 0.5) / 100
+            daily_cost_per_person = (
+                math.floor(total_cents / (total_days * group_size) + 0.5) / 100 if total_days > 0 else 0
+            )
+        else:
+            cost_per_person = daily_cost_per_person = 0
 
         # 创建详细费用分解
         expense_breakdown = {
@@ -127,17 +225,17 @@ class ExpenseCalculator:
             'budget_range': budget_range,
 
             # 主要费用类别
-            'accommodation_cost': round(accommodation_cost, 2),    # 住宿费用
-            'food_cost': round(food_cost, 2),                     # 餐饮费用
-            'activities_cost': round(activities_cost, 2),         # 活动费用
-            'transportation_cost': round(transportation_cost, 2), # 交通费用
-            'miscellaneous_cost': round(miscellaneous_cost, 2),   # 杂项费用
+            'accommodation_cost': accommodation_cents / 100,      # 住宿费用
+            'food_cost': food_cents / 100,                        # 餐饮费用
+            'activities_cost': activities_cents / 100,            # 活动费用
+            'transportation_cost': transportation_cents / 100,    # 交通费用
+            'miscellaneous_cost': miscellaneous_cents / 100,      # 杂项费用
 
             # 费用汇总
-            'total_cost': round(total_cost, 2),                   # 总费用
-            'daily_budget': round(daily_budget, 2),               # 每日预算
-            'cost_per_person': round(total_cost / group_size, 2) if group_size > 0 else 0,        # 人均费用
-            'daily_cost_per_person': round(daily_budget / group_size, 2) if group_size > 0 else 0, # 人均每日费用
+            'total_cost': total_cents / 100,                      # 总费用
+            'daily_budget': daily_budget_cents / 100,             # 每日预算
+            'cost_per_person': cost_per_person,                   # 人均费用
+            'daily_cost_per_person': daily_cost_per_person,       # 人均每日费用
 
             # 详细费用分解
             'detailed_breakdown': self._create_detailed_breakdown(
@@ -153,7 +251,8 @@ class ExpenseCalculator:
         
         return expense_breakdown
     
-    def _calculate_accommodation_cost(self, hotels: List[Hotel], total_days: int, budget_range: str) -> float:
+    def _calculate_accommodation_cost(self, hotels: List[Hotel], total_days: int, budget_range: str,
+                                    fallback_nightly_cost: float) -> float:
         """
         计算住宿费用
 
@@ -166,22 +265,21 @@ class ExpenseCalculator:
         - hotels: 可选酒店列表
         - total_days: 总住宿天数
         - budget_range: 预算范围
+        - fallback_nightly_cost: 没有酒店数据时使用的每晚住宿费用
 
         返回：总住宿费用（人民币）
         """
         if not hotels:
             # 回退估算（如果没有酒店数据）
-            base_costs = {'经济型': 280, '中等预算': 700, '豪华型': 1750}
-            return base_costs.get(budget_range, 700) * total_days
+            return fallback_nightly_cost * total_days
 
         # 根据预算选择最合适的酒店
-        suitable_hotels = self._filter_hotels_by_budget(hotels, budget_range)
-        selected_hotel = suitable_hotels[0] if suitable_hotels else hotels[0]
+        selected_hotel = self._select_hotel_for_budget(hotels, budget_range)
 
         return selected_hotel.calculate_total_cost(total_days)
     
     def _calculate_food_cost(self, restaurants: List[Attraction], total_days: int,
-                           group_size: int, budget_range: str) -> float:
+                           group_size: int, fallback_daily_cost: float) -> float:
         """
         计算餐饮费用
 
@@ -194,24 +292,23 @@ class ExpenseCalculator:
         - restaurants: 推荐餐厅列表
         - total_days: 总天数
         - group_size: 团队人数
-        - budget_range: 预算范围
+        - fallback_daily_cost: 没有餐厅数据时使用的每人每日餐饮费用（每天3餐）
 
         返回：总餐饮费用（人民币）
         """
         if not restaurants:
             # 回退估算（每天3餐）
-            base_daily_cost = {'经济型': 175, '中等预算': 350, '豪华型': 700}
-            return base_daily_cost.get(budget_range, 350) * total_days * group_size
+            return fallback_daily_cost * total_days * group_size
 
         # 基于餐厅费用计算（假设每天2-3次餐厅用餐）
-        avg_meal_cost = sum(r.estimated_cost for r in restaurants[:5]) / min(len(restaurants), 5)
+        avg_meal_cost = _average_cost(restaurants, 5)
         meals_per_day = 2.5  # 平均每天2-3次餐厅用餐
 
         daily_food_cost = avg_meal_cost * meals_per_day * group_size
         return daily_food_cost * total_days
     
-    def _calculate_activities_cost(self, activities: List[Attraction], total_days: int,
-                                 group_size: int, budget_range: str) -> float:
+    def _calculate_activities_cost(self, attractions: List[Attraction], activities: List[Attraction],
+                                 total_days: int, group_size: int, fallback_daily_cost: float) -> float:
         """
         计算活动和景点费用
 
@@ -221,26 +318,28 @@ class ExpenseCalculator:
         3. 考虑每日活动频率和团队人数
 
         参数：
-        - activities: 计划的活动和景点列表
+        - attractions: 计划的景点列表
+        - activities: 计划的活动列表
         - total_days: 总天数
         - group_size: 团队人数
-        - budget_range: 预算范围
+        - fallback_daily_cost: 没有活动数据时使用的每人每日活动费用
 
         返回：总活动费用（人民币）
         """
-        if not activities:
+        planned_count = len(attractions) + len(activities)
+        if not planned_count:
             # 回退估算
-            base_daily_cost = {'经济型': 210, '中等预算': 420, '豪华型': 840}
-            return base_daily_cost.get(budget_range, 420) * total_days * group_size
+            return fallback_daily_cost * total_days * group_size
 
-        # 基于计划活动计算（每天1-2个主要活动）
-        activities_per_day = min(2, len(activities) / max(total_days, 1))
-        avg_activity_cost = sum(a.estimated_cost for a in activities[:10]) / min(len(activities), 10)
+        # 基于计划活动计算（每天1-2个主要活动）；景点在前、活动在后依次取前10项求平均，
+        # 用 chain 串联两个列表，不必拼接出新列表
+        activities_per_day = min(2, planned_count / max(total_days, 1))
+        avg_activity_cost = _average_cost(chain(attractions, activities), 10)
 
         daily_activities_cost = avg_activity_cost * activities_per_day * group_size
         return daily_activities_cost * total_days
 
-    def _calculate_transportation_cost(self, total_days: int, group_size: int, budget_range: str) -> float:
+    def _calculate_transportation_cost(self, total_days: int, group_size: int, daily_transport_cost: float) -> float:
         """
         计算交通费用
 
@@ -252,12 +351,10 @@ class ExpenseCalculator:
         参数：
         - total_days: 总天数
         - group_size: 团队人数
-        - budget_range: 预算范围
+        - daily_transport_cost: 当前预算范围的每日交通费用
 
         返回：总交通费用（人民币）
         """
-        daily_transport_cost = self.transportation_costs.get(budget_range, 250)
-
         # 大团队优惠（拼车等，非线性增长）
         if group_size > 2:
             group_multiplier = 1 + (group_size - 1) * 0.7  # 非线性缩放
@@ -266,7 +363,7 @@ class ExpenseCalculator:
 
         return daily_transport_cost * group_multiplier * total_days
 
-    def _calculate_miscellaneous_cost(self, total_days: int, group_size: int, budget_range: str) -> float:
+    def _calculate_miscellaneous_cost(self, total_days: int, group_size: int, daily_misc_cost: float) -> float:
         """
         计算杂项费用（购物、小费、紧急情况）
 
@@ -278,36 +375,36 @@ class ExpenseCalculator:
         参数：
         - total_days: 总天数
         - group_size: 团队人数
-        - budget_range: 预算范围
+        - daily_misc_cost: 当前预算范围的每人每日杂项费用
 
         返回：总杂项费用（人民币）
         """
-        daily_misc_cost = self.miscellaneous_costs.get(budget_range, 280)
         return daily_misc_cost * group_size * total_days
     
-    def _filter_hotels_by_budget(self, hotels: List[Hotel], budget_range: str) -> List[Hotel]:
-        """Filter hotels based on budget range"""
-        budget_ranges = {
-            'budget': (0, 80),
-            'mid-range': (80, 200),
-            'luxury': (200, 1000)
-        }
+    def _select_hotel_for_budget(self, hotels: List[Hotel], budget_range: str) -> Hotel:
+        """Return the first hotel priced within the budget range (CNY per night), or the first hotel if none is"""
+        min_price, max_price = _HOTEL_PRICE_RANGES.get(budget_range, _HOTEL_PRICE_RANGES['中等预算'])
         
-        min_price, max_price = budget_ranges.get(budget_range, (80, 200))
-        
-        suitable_hotels = [h for h in hotels if min_price <= h.price_per_night <= max_price]
-        return suitable_hotels if suitable_hotels else hotels
+        # 酒店列表已按推荐度排序，找到第一个符合预算的酒店即可停止
+        return next((h for h in hotels if min_price <= h.price_per_night <= max_price), hotels[0])
     
     def _create_detailed_breakdown(self, hotels: List[Hotel], attractions: List[Attraction], 
                                  restaurants: List[Attraction], activities: List[Attraction], 
                                  trip_details: Dict[str, Any]) -> Dict[str, Any]:
         """Create detailed expense breakdown"""
+        # 旅行详情中的字段只读取一次；预算范围的默认值与 calculate_total_expenses 一致
+        total_days = trip_details['total_days']
+        group_size = trip_details.get('group_size', 1)
+        budget_range = trip_details.get('budget_range', '中等预算')
+        daily_costs = self.daily_costs.get(budget_range, self.daily_costs['中等预算'])
+        hotel = hotels[0] if hotels else None
+
         breakdown = {
             'accommodation': {
-                'recommended_hotel': hotels[0].name if hotels else 'Standard Hotel',
-                'price_per_night': hotels[0].price_per_night if hotels else 100,
-                'total_nights': trip_details['total_days'],
-                'total_cost': hotels[0].calculate_total_cost(trip_details['total_days']) if hotels else 100 * trip_details['total_days']
+                'recommended_hotel': hotel.name if hotel else 'Standard Hotel',
+                'price_per_night': hotel.price_per_night if hotel else 100,
+                'total_nights': total_days,
+                'total_cost': hotel.calculate_total_cost(total_days) if hotel else 100 * total_days
             },
             
             'dining': [
@@ -340,16 +437,16 @@ class ExpenseCalculator:
             ],
             
             'transportation': {
-                'daily_estimate': self.transportation_costs.get(trip_details.get('budget_range', 'mid-range'), 35),
-                'total_days': trip_details['total_days'],
-                'group_size': trip_details['group_size'],
-                'description': self._get_transportation_description(trip_details.get('budget_range', 'mid-range'))
+                'daily_estimate': daily_costs['transportation'],
+                'total_days': total_days,
+                'group_size': group_size,
+                'description': self._get_transportation_description(budget_range)
             },
             
             'miscellaneous': {
-                'daily_estimate': self.miscellaneous_costs.get(trip_details.get('budget_range', 'mid-range'), 40),
-                'total_days': trip_details['total_days'],
-                'group_size': trip_details['group_size'],
+                'daily_estimate': daily_costs['miscellaneous'],
+                'total_days': total_days,
+                'group_size': group_size,
                 'includes': ['Shopping', 'Tips', 'Souvenirs', 'Emergency fund', 'Incidentals']
             }
         }
@@ -373,9 +470,9 @@ class ExpenseCalculator:
     def _get_transportation_description(self, budget_range: str) -> str:
         """Get transportation description based on budget"""
         descriptions = {
-            'budget': 'Public transport, walking, occasional taxi',
-            'mid-range': 'Mix of public transport, taxis, and ride-sharing',
-            'luxury': 'Private transport, taxis, premium services'
+            '经济型': 'Public transport, walking, occasional taxi',
+            '中等预算': 'Mix of public transport, taxis, and ride-sharing',
+            '豪华型': 'Private transport, taxis, premium services'
         }
         return descriptions.get(budget_range, 'Mixed transportation options')
     
@@ -383,10 +480,15 @@ class ExpenseCalculator:
         """Compare costs across different budget ranges"""
         base_total = base_expenses['total_cost']
         base_budget = base_expenses['budget_range']
+        trip_duration = base_expenses['trip_duration']
+        
+        # 预算范围的键与 budget_multipliers 一致（经济型/中等预算/豪华型），比例在初始化时已算好
+        ratios = self._budget_ratios.get(base_budget, self._budget_ratios['中等预算'])
+        base_cents = _to_cents(base_total)
         
         comparison = {}
         
-        for budget_range in ['budget', 'mid-range', 'luxury']:
+        for budget_range, ratio in ratios.items():
             if budget_range == base_budget:
                 comparison[budget_range] = {
                     'total_cost': base_total,
@@ -395,14 +497,14 @@ class ExpenseCalculator:
                     'percentage_change': 0
                 }
             else:
-                multiplier = self.budget_multipliers[budget_range] / self.budget_multipliers[base_budget]
-                adjusted_total = base_total * multiplier
+                # 以“分”为单位计算，差额由整数相减得到，不会出现浮点误差
+                adjusted_cents = _to_cents(base_total * ratio)
                 
                 comparison[budget_range] = {
-                    'total_cost': round(adjusted_total, 2),
-                    'daily_budget': round(adjusted_total / base_expenses['trip_duration'], 2),
-                    'difference': round(adjusted_total - base_total, 2),
-                    'percentage_change': round(((adjusted_total - base_total) / base_total) * 100, 1)
+                    'total_cost': adjusted_cents / 100,
+                    'daily_budget': math.floor(adjusted_cents / trip_duration + 0.5) / 100,
+                    'difference': (adjusted_cents - base_cents) / 100,
+                    'percentage_change': round((ratio - 1) * 100, 1)
                 }
         
         return comparison
@@ -423,36 +525,21 @@ class ExpenseCalculator:
         这个方法展示了如何根据数据分析结果
         生成个性化的建议和推荐。
         """
-        tips = []
         budget_range = expenses.get('budget_range', '中等预算')
         percentages = expenses.get('cost_percentages', {})
 
-        # 住宿费用优化建议
-        if percentages.get('accommodation', 0) > 40:
-            tips.append("考虑入住经济型酒店或民宿以降低住宿成本")
-            tips.append("选择市中心外围的酒店可获得更优惠的价格")
-
-        # 餐饮费用优化建议
-        if percentages.get('food', 0) > 35:
-            tips.append("尝试当地街头美食和市场，既正宗又经济实惠")
-            tips.append("选择包含早餐的酒店可节省餐饮费用")
-
-        # 活动费用优化建议
-        if percentages.get('activities', 0) > 30:
-            tips.append("寻找免费的徒步游览和公共景点")
-            tips.append("查看活动和景点的团体折扣优惠")
-
-        # 交通费用优化建议
-        if percentages.get('transportation', 0) > 20:
-            tips.append("尽可能使用公共交通而非出租车")
-            tips.append("考虑购买多日城市交通通票")
+        # 费用占比超过阈值的类别给出对应建议
+        tips = [
+            tip
+            for category, threshold, category_tips in _COST_SAVING_RULES
+            if percentages.get(category, 0) > threshold
+            for tip in category_tips
+        ]
 
         # 基于预算范围的通用建议
         if budget_range != '经济型':
-            tips.append("选择淡季出行可获得更优惠的价格")
-            tips.append("提前预订住宿和活动可享受早鸟折扣")
+            tips.extend(_NON_BUDGET_TIPS)
 
-        tips.append("预留10-15%的预算用于意外支出")
-        tips.append("使用旅行应用寻找优惠并比较价格")
+        tips.extend(_GENERAL_TIPS)
 
         return tips
\ No newline at end of file
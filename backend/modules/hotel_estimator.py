@@ -14,13 +14,90 @@
 包含价格预测、地区调整和用户偏好匹配。
 """
 
+import httpx
 import requests
 import json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import List, Dict, Any, Optional
 import random
+from functools import lru_cache
 from ..data.models import Hotel
 from ..config.api_config import api_config
 
+# orjson 是可选依赖：安装后用于解析API响应，未安装时回退到标准库 json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _parse_json(content: bytes) -> Any:
+    """解析HTTP响应体中的JSON数据"""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+# 酒店设施候选列表
+_BASIC_AMENITIES = ('免费WiFi', '空调', '24小时前台')
+
+_MID_RANGE_AMENITIES = (
+    '餐厅', '客房服务', '健身中心', '商务中心',
+    '洗衣服务', '停车场', '含早餐'
+)
+
+_LUXURY_AMENITIES = (
+    'SPA', '游泳池', '礼宾服务', '机场接送',
+    '多个餐厅', '酒吧/休息室', '代客泊车',
+    '高级床品', '迷你吧', '阳台/景观'
+)
+
+# Google Places 价格等级（0-4）对应的价格倍数
+_PRICE_LEVEL_MULTIPLIERS = {0: 0.6, 1: 0.8, 2: 1.0, 3: 1.3, 4: 1.8}
+
+@lru_cache(maxsize=64)
+def _price_factor(price_level: int, rating_bucket: int) -> float:
+    """
+    计算价格等级和评分档位对应的房价倍数
+
+    rating_bucket 为 int(评分 × 2)，即每0.5分一档。评分的分界线（3.5、4.0、4.5）
+    都落在档位边界上，因此按档位计算与按原始评分计算的结果相同。
+    """
+    # 根据价格等级调整（Google Places的0-4级价格体系）
+    price_multiplier = _PRICE_LEVEL_MULTIPLIERS.get(price_level, 1.0)
+
+    # 根据评分调整（高评分酒店通常更贵）
+    if rating_bucket >= 9:
+        rating_multiplier = 1.2    # 优秀酒店（4.5分及以上）
+    elif rating_bucket >= 8:
+        rating_multiplier = 1.1    # 良好酒店（4.0分及以上）
+    elif rating_bucket < 7:
+        rating_multiplier = 0.9    # 一般酒店（低于3.5分）
+    else:
+        rating_multiplier = 1.0    # 标准酒店
+
+    return price_multiplier * rating_multiplier
+
+@lru_cache(maxsize=32)
+def _amenities_for(price_level: int, rating_bucket: int) -> tuple:
+    """
+    生成某个价格等级和评分档位的设施组合
+
+    rating_bucket 为 int(评分 × 2)，即每0.5分一档。
+    抽样使用由档位决定的随机种子，同一档位总是得到相同的结果，因此可以缓存。
+    """
+    rng = random.Random(price_level * 100 + rating_bucket)
+    amenities = list(_BASIC_AMENITIES)
+
+    # 中档酒店添加中档设施
+    if price_level >= 2:
+        amenities.extend(rng.sample(_MID_RANGE_AMENITIES, min(4, len(_MID_RANGE_AMENITIES))))
+
+    # 高档酒店或高评分酒店添加豪华设施（评分 >= 4.5 即档位 >= 9）
+    if price_level >= 3 or rating_bucket >= 9:
+        amenities.extend(rng.sample(_LUXURY_AMENITIES, min(3, len(_LUXURY_AMENITIES))))
+
+    return tuple(dict.fromkeys(amenities))  # 去除重复项，同时保持设施的先后顺序
+
 class HotelEstimator:
     """
     酒店查找和住宿费用估算服务类
@@ -56,6 +133,16 @@ class HotelEstimator:
         self.base_url = api_config.PLACES_BASE_URL       # API基础URL
         self.session = requests.Session()                # HTTP会话对象
 
+        # 连接池保持与API服务器的长连接，避免每次搜索都重新建立TLS连接；
+        # 遇到限流（429）或服务器错误（5xx）时自动退避重试
+        adapter = HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=20,
+            max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
+        )
+        self.session.mount('https://', adapter)
+        self._async_session: Optional[httpx.AsyncClient] = None  # 异步HTTP客户端（首次异步搜索时创建）
+
         # 不同预算类别的基础价格范围（每晚，人民币）
         self.budget_price_ranges = {
             '经济型': {'min': 200, 'max': 560, 'avg': 350},      # 经济型酒店
@@ -98,27 +185,72 @@ class HotelEstimator:
         4. 回退到模拟数据（如果需要）
         """
         try:
-            hotels = []
+            hotels_data = []
             destination = trip_details['destination']                    # 目的地
-            budget_range = trip_details.get('budget_range', '中等预算')  # 预算范围
 
             # 首先尝试API搜索
             if self.api_key:
                 hotels_data = self._search_hotels_api(destination)
-                hotels = self._process_hotels_data(hotels_data, trip_details)
 
-            # 如果API失败，回退到模拟数据
-            if not hotels:
-                hotels = self._generate_mock_hotels(trip_details)
-            
-            # 按评分和价格适配度排序
-            hotels = self._rank_hotels(hotels, budget_range)
+            return self._select_hotels(hotels_data, trip_details)
+
+        except Exception as e:
+            print(f"查找酒店时出错: {e}")
+            return self._generate_mock_hotels(trip_details)
+
+    async def find_hotels_async(self, trip_details: Dict[str, Any]) -> List[Hotel]:
+        """
+        find_hotels 的异步版本
+
+        在异步代码（如FastAPI接口或异步智能体节点）中使用，
+        等待Google Places响应时不会阻塞事件循环，多个目的地的搜索可以并发进行。
 
-            return hotels[:6]  # 返回前6个最佳选择
+        参数：
+        - trip_details: 包含目的地、预算等信息的旅行详情字典
+
+        返回：Hotel对象列表，按推荐度排序
+        """
+        try:
+            hotels_data = []
+            destination = trip_details['destination']                    # 目的地
+
+            # 首先尝试API搜索
+            if self.api_key:
+                hotels_data = await self._search_hotels_api_async(destination)
+
+            return self._select_hotels(hotels_data, trip_details)
 
         except Exception as e:
             print(f"查找酒店时出错: {e}")
             return self._generate_mock_hotels(trip_details)
+
+    def _select_hotels(self, hotels_data: List[Dict], trip_details: Dict[str, Any]) -> List[Hotel]:
+        """把API搜索结果处理为排序后的推荐酒店，没有结果时使用模拟数据"""
+        budget_range = trip_details.get('budget_range', '中等预算')  # 预算范围
+        hotels = self._process_hotels_data(hotels_data, trip_details) if hotels_data else []
+
+        # 如果API失败，回退到模拟数据
+        if not hotels:
+            hotels = self._generate_mock_hotels(trip_details)
+
+        # 按评分和价格适配度排序
+        hotels = self._rank_hotels(hotels, budget_range)
+
+        return hotels[:6]  # 返回前6个最佳选择
+
+    async def aclose(self):
+        """关闭异步HTTP客户端，释放底层连接池（应用关闭时调用）"""
+        if self._async_session is not None:
+            await self._async_session.aclose()
+            self._async_session = None
+
+    def _hotel_search_params(self, destination: str) -> Dict[str, str]:
+        """构造Google Places文本搜索的查询参数"""
+        return {
+            'query': f'{destination} 酒店',  # 中文搜索查询
+            'key': self.api_key,
+            'type': 'lodging'  # 住宿类型
+        }
     
     def _search_hotels_api(self, destination: str) -> List[Dict]:
         """
@@ -134,15 +266,35 @@ class HotelEstimator:
         """
         try:
             url = f"{self.base_url}/textsearch/json"
-            params = {
-                'query': f'{destination} 酒店',  # 中文搜索查询
-                'key': self.api_key,
-                'type': 'lodging'  # 住宿类型
-            }
+            params = self._hotel_search_params(destination)
+
+            response = self.session.get(url, params=params, timeout=10)
+            response.raise_for_status()
+            data = _parse_json(response.content)
+
+            return data.get('results', [])
+
+        except Exception as e:
+            print(f"酒店API搜索失败: {e}")
+            return []
+
+    async def _search_hotels_api_async(self, destination: str) -> List[Dict]:
+        """
+        _search_hotels_api 的异步版本，使用共享的 httpx.AsyncClient
+
+        参数：
+        - destination: 目的地名称
+
+        返回：包含酒店信息的字典列表
+        """
+        try:
+            if self._async_session is None:
+                self._async_session = httpx.AsyncClient(timeout=10.0)
 
-            response = self.session.get(url, params=params)
+            url = f"{self.base_url}/textsearch/json"
+            response = await self._async_session.get(url, params=self._hotel_search_params(destination))
             response.raise_for_status()
-            data = response.json()
+            data = _parse_json(response.content)
 
             return data.get('results', [])
 
@@ -166,6 +318,7 @@ class HotelEstimator:
         hotels = []
         destination = trip_details['destination']
         budget_range = trip_details.get('budget_range', '中等预算')
+        base_price = self._city_base_price(destination, budget_range)  # 整批酒店共用的基础房价
 
         for hotel_data in hotels_data:
             try:
@@ -175,7 +328,7 @@ class HotelEstimator:
                 price_level = hotel_data.get('price_level', 2)
 
                 # 估算每晚价格
-                price_per_night = self._estimate_hotel_price(destination, budget_range, price_level, rating)
+                price_per_night = self._price_from_base(base_price, price_level, rating)
 
                 # 根据价格等级和评分生成设施
                 amenities = self._generate_amenities(price_level, rating)
@@ -215,29 +368,27 @@ class HotelEstimator:
 
         返回：估算的每晚价格（人民币）
         """
+        return self._price_from_base(self._city_base_price(destination, budget_range), price_level, rating)
+
+    def _city_base_price(self, destination: str, budget_range: str) -> float:
+        """
+        计算目的地在某个预算范围下的基础房价（已乘城市价格倍数）
+
+        同一批酒店的目的地和预算相同，批量估价时只需计算一次。
+        """
         # 获取基础价格范围
         base_range = self.budget_price_ranges.get(budget_range, self.budget_price_ranges['中等预算'])
-        base_price = base_range['avg']
 
         # 应用城市价格倍数
         city_key = destination.lower()
         multiplier = self.city_multipliers.get(city_key, self.city_multipliers['default'])
 
-        # 根据价格等级调整（Google Places的0-4级价格体系）
-        price_level_multipliers = {0: 0.6, 1: 0.8, 2: 1.0, 3: 1.3, 4: 1.8}
-        price_multiplier = price_level_multipliers.get(price_level, 1.0)
+        return base_range['avg'] * multiplier
 
-        # 根据评分调整（高评分酒店通常更贵）
-        if rating >= 4.5:
-            rating_multiplier = 1.2    # 优秀酒店
-        elif rating >= 4.0:
-            rating_multiplier = 1.1    # 良好酒店
-        elif rating < 3.5:
-            rating_multiplier = 0.9    # 一般酒店
-        else:
-            rating_multiplier = 1.0    # 标准酒店
-
-        final_price = base_price * multiplier * price_multiplier * rating_multiplier
+    @staticmethod
+    def _price_from_base(base_price: float, price_level: int, rating: float) -> float:
+        """根据价格等级、评分和随机变化，从基础房价得到单个酒店的每晚价格"""
+        final_price = base_price * _price_factor(price_level, int(rating * 2))
 
         # 添加随机变化以增加真实性
         final_price *= random.uniform(0.9, 1.1)
@@ -250,6 +401,8 @@ class HotelEstimator:
 
         这个方法根据酒店的价格等级和评分，
         智能生成相应的酒店设施和服务。
+        相同价格等级和评分档位（每0.5分一档）的酒店得到相同的设施，
+        结果会被缓存，不必为每个酒店重新抽样。
 
         参数：
         - price_level: 价格等级（0-4）
@@ -257,30 +410,7 @@ class HotelEstimator:
 
         返回：酒店设施列表
         """
-        basic_amenities = ['免费WiFi', '空调', '24小时前台']
-
-        mid_range_amenities = [
-            '餐厅', '客房服务', '健身中心', '商务中心',
-            '洗衣服务', '停车场', '含早餐'
-        ]
-
-        luxury_amenities = [
-            'SPA', '游泳池', '礼宾服务', '机场接送',
-            '多个餐厅', '酒吧/休息室', '代客泊车',
-            '高级床品', '迷你吧', '阳台/景观'
-        ]
-
-        amenities = basic_amenities.copy()
-
-        # 中档酒店添加中档设施
-        if price_level >= 2:
-            amenities.extend(random.sample(mid_range_amenities, min(4, len(mid_range_amenities))))
-
-        # 高档酒店或高评分酒店添加豪华设施
-        if price_level >= 3 or rating >= 4.5:
-            amenities.extend(random.sample(luxury_amenities, min(3, len(luxury_amenities))))
-
-        return list(set(amenities))  # 去除重复项
+        return list(_amenities_for(price_level, int(rating * 2)))
     
     def _generate_mock_hotels(self, trip_details: Dict) -> List[Hotel]:
         """
@@ -349,10 +479,11 @@ class HotelEstimator:
         ]
 
         hotels = []
+        base_price = self._city_base_price(destination, budget_range)  # 整批酒店共用的基础房价
         for hotel_data in mock_hotels_data:
             # 估算每晚价格
-            price_per_night = self._estimate_hotel_price(
-                destination, budget_range, hotel_data['price_level'], hotel_data['rating']
+            price_per_night = self._price_from_base(
+                base_price, hotel_data['price_level'], hotel_data['rating']
             )
 
             # 生成酒店设施
@@ -392,31 +523,30 @@ class HotelEstimator:
         """
         target_range = self.budget_price_ranges.get(budget_range, self.budget_price_ranges['中等预算'])
 
-        scored_hotels = []
-        for hotel in hotels:
-            score = 0
+        # 与具体酒店无关的数值只计算一次
+        min_price = target_range['min']
+        max_price = target_range['max']
+        avg_price = target_range['avg']
+        max_diff = max_price - min_price
+
+        def score_hotel(hotel: Hotel) -> float:
+            price = hotel.price_per_night
 
             # 基于评分的得分
-            score += hotel.rating * 10
+            score = hotel.rating * 10
 
             # 基于价格适配度的得分
-            price_diff = abs(hotel.price_per_night - target_range['avg'])
-            max_diff = target_range['max'] - target_range['min']
-            price_score = max(0, 10 - (price_diff / max_diff * 10))
-            score += price_score
+            score += max(0, 10 - (abs(price - avg_price) / max_diff * 10))
 
             # 在预算范围内的奖励分
-            if target_range['min'] <= hotel.price_per_night <= target_range['max']:
+            if min_price <= price <= max_price:
                 score += 5
 
             # 设施质量奖励分
-            score += len(hotel.amenities) * 0.5
-
-            scored_hotels.append((hotel, score))
+            return score + len(hotel.amenities) * 0.5
 
-        # 按分数降序排序
-        scored_hotels.sort(key=lambda x: x[1], reverse=True)
-        return [hotel for hotel, _ in scored_hotels]
+        # 按分数降序排序（每个酒店只计算一次分数，分数相同时保持原有顺序）
+        return sorted(hotels, key=score_hotel, reverse=True)
     
     def calculate_accommodation_cost(self, hotels: List[Hotel], nights: int, budget_range: str) -> Dict[str, Any]:
         """
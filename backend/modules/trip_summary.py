@@ -1,8 +1,41 @@
 import json
-from typing import Dict, Any, List
+import math
+from typing import Dict, Any, List, Tuple
 from datetime import datetime
+from heapq import heappush, heappushpop
+from itertools import count
 from ..data.models import TripSummary, DayPlan, Hotel, Weather
 
+def _keep_top(heap: List[Tuple[float, int, Any]], limit: int, item: Any, seq: int):
+    """
+    把项目放入最多保留 limit 个元素的最小堆，堆顶始终是当前最容易被淘汰的项目
+
+    堆元素为 (评分, -序号, 项目)：评分相同时序号大（出现较晚）的项目先被淘汰，
+    与稳定排序后取前几名的结果一致；序号唯一，因此永远不会比较项目对象本身。
+    """
+    entry = (item.rating, -seq, item)
+    if len(heap) < limit:
+        heappush(heap, entry)
+    else:
+        heappushpop(heap, entry)
+
+def _sorted_top(heap: List[Tuple[float, int, Any]]) -> List[Any]:
+    """按评分从高到低（评分相同按出现顺序）返回堆中的项目"""
+    return [item for _, _, item in sorted(heap, reverse=True)]
+
+def _classify_weather(description: str) -> Tuple[bool, bool]:
+    """
+    判断天气描述是否为雨天、晴天
+
+    描述只转换一次小写，同时兼容中文和英文的天气描述。
+
+    返回：(是否雨天, 是否晴天)
+    """
+    description_lower = description.lower()
+    is_rainy = '雨' in description or 'rain' in description_lower
+    is_sunny = '晴' in description or 'sun' in description_lower or 'clear' in description_lower
+    return is_rainy, is_sunny
+
 class TripSummaryGenerator:
     """
     旅行总结生成器类
@@ -21,22 +54,8 @@ class TripSummaryGenerator:
     分解为多个小的、专门的方法，每个方法负责生成总结的一个特定部分。
     """
 
-    def __init__(self):
-        """
-        初始化旅行总结生成器
-
-        创建一个包含所有总结部分的模板字典，用于组织生成的内容
-        """
-        # 总结模板：定义了旅行总结包含的所有主要部分
-        self.summary_template = {
-            'trip_overview': {},          # 行程概览
-            'weather_summary': {},        # 天气总结
-            'accommodation_summary': {},  # 住宿总结
-            'expense_summary': {},        # 费用总结
-            'itinerary_highlights': {},   # 行程亮点
-            'recommendations': {},        # 个性化建议
-            'travel_tips': {}            # 旅行贴士
-        }
+    # 生成器没有实例状态，不需要为每个实例创建 __dict__
+    __slots__ = ()
     
     def generate_summary(self, trip_details: Dict[str, Any], weather_data: List[Weather],
                         hotels: List[Hotel], expense_breakdown: Dict[str, Any],
@@ -152,30 +171,50 @@ class TripSummaryGenerator:
         if not weather_data:
             return {'status': '天气数据不可用'}
 
-        # 提取所有天气数据中的温度和天气描述
-        temperatures = [w.temperature for w in weather_data]
-        conditions = [w.description for w in weather_data]
+        # 只遍历一次天气数据，同时统计温度范围、特殊天气天数和每日预报
+        temp_min = math.inf
+        temp_max = -math.inf
+        temp_sum = 0.0
+        rainy_days = 0
+        sunny_days = 0
+        conditions = set()
+        daily_forecast = []
+
+        for w in weather_data:
+            temperature = w.temperature
+            description = w.description
+
+            if temperature < temp_min:
+                temp_min = temperature
+            if temperature > temp_max:
+                temp_max = temperature
+            temp_sum += temperature
+
+            # 统计特殊天气天数（用于打包建议）
+            is_rainy, is_sunny = _classify_weather(description)
+            rainy_days += is_rainy
+            sunny_days += is_sunny
+            conditions.add(description)
+
+            daily_forecast.append({
+                'date': w.date,                                              # 日期
+                'temperature': temperature,                                  # 温度
+                'condition': description,                                    # 天气状况
+                'feels_like': w.feels_like                                   # 体感温度
+            })
 
         # 构建天气总结
         summary = {
             'forecast_period': f"{len(weather_data)} 天",                    # 预报天数
             'temperature_range': {                                           # 温度范围
-                'min': min(temperatures),                                    # 最低温度
-                'max': max(temperatures),                                    # 最高温度
-                'average': round(sum(temperatures) / len(temperatures), 1)   # 平均温度
+                'min': temp_min,                                             # 最低温度
+                'max': temp_max,                                             # 最高温度
+                'average': round(temp_sum / len(weather_data), 1)            # 平均温度
             },
-            'conditions': list(set(conditions)),                             # 去重后的天气条件列表
-            # 统计特殊天气天数（用于打包建议）
-            'rainy_days': len([w for w in weather_data if '雨' in w.description or 'rain' in w.description.lower()]),
-            'sunny_days': len([w for w in weather_data if '晴' in w.description or 'sun' in w.description.lower() or 'clear' in w.description.lower()]),
-            'daily_forecast': [                                              # 每日详细预报
-                {
-                    'date': w.date,                                          # 日期
-                    'temperature': w.temperature,                            # 温度
-                    'condition': w.description,                              # 天气状况
-                    'feels_like': w.feels_like                              # 体感温度
-                } for w in weather_data
-            ]
+            'conditions': list(conditions),                                  # 去重后的天气条件列表
+            'rainy_days': rainy_days,                                        # 雨天天数
+            'sunny_days': sunny_days,                                        # 晴天天数
+            'daily_forecast': daily_forecast                                 # 每日详细预报
         }
 
         # 根据平均温度生成打包建议
@@ -329,21 +368,38 @@ class TripSummaryGenerator:
         if not itinerary:
             return {'status': '暂无行程安排'}
 
-        # 收集所有的景点、餐厅和活动信息
-        all_attractions = []    # 所有景点
-        all_restaurants = []    # 所有餐厅
-        all_activities = []     # 所有活动
+        # 只遍历一次行程：同时生成每日概览，并把景点、餐厅、活动放入固定大小的最小堆，
+        # 堆中始终只保留当前评分最高的前几名，不需要先收集到中间列表再排序
+        top_attractions = []    # 评分前5的景点
+        top_restaurants = []    # 评分前5的餐厅
+        top_activities = []     # 评分前3的活动
+        daily_overview = []     # 每日概览
+        order = count()
 
-        # 遍历每日行程，收集所有项目
         for day in itinerary:
-            all_attractions.extend(day.attractions)
-            all_restaurants.extend(day.restaurants)
-            all_activities.extend(day.activities)
-
-        # 按评分排序，选出最佳推荐
-        top_attractions = sorted(all_attractions, key=lambda x: x.rating, reverse=True)[:5]  # 前5个景点
-        top_restaurants = sorted(all_restaurants, key=lambda x: x.rating, reverse=True)[:5]  # 前5个餐厅
-        top_activities = sorted(all_activities, key=lambda x: x.rating, reverse=True)[:3]    # 前3个活动
+            for attr in day.attractions:
+                _keep_top(top_attractions, 5, attr, next(order))
+            for rest in day.restaurants:
+                _keep_top(top_restaurants, 5, rest, next(order))
+            for act in day.activities:
+                _keep_top(top_activities, 3, act, next(order))
+
+            daily_overview.append({
+                'day': day.day,                                                  # 第几天
+                'date': day.date,                                                # 日期
+                'weather': day.weather.description,                             # 天气状况
+                'temperature': day.weather.temperature,                         # 温度
+                'planned_activities': len(day.attractions) + len(day.activities), # 计划活动数量
+                'dining_options': len(day.restaurants),                         # 用餐选择数量
+                'estimated_cost': day.daily_cost,                               # 预估每日费用
+                'highlights': [attr.name for attr in day.attractions[:2]] +     # 当日亮点（前2个景点+1个活动）
+                            [act.name for act in day.activities[:1]]
+            })
+
+        # 按评分从高到低取出堆中的项目
+        top_attractions = _sorted_top(top_attractions)
+        top_restaurants = _sorted_top(top_restaurants)
+        top_activities = _sorted_top(top_activities)
 
         highlights = {
             'total_days_planned': len(itinerary),                                    # 计划总天数
@@ -373,19 +429,7 @@ class TripSummaryGenerator:
                     'description': act.description                                   # 活动描述
                 } for act in top_activities
             ],
-            'daily_overview': [                                                      # 每日概览
-                {
-                    'day': day.day,                                                  # 第几天
-                    'date': day.date,                                                # 日期
-                    'weather': day.weather.description,                             # 天气状况
-                    'temperature': day.weather.temperature,                         # 温度
-                    'planned_activities': len(day.attractions) + len(day.activities), # 计划活动数量
-                    'dining_options': len(day.restaurants),                         # 用餐选择数量
-                    'estimated_cost': day.daily_cost,                               # 预估每日费用
-                    'highlights': [attr.name for attr in day.attractions[:2]] +     # 当日亮点（前2个景点+1个活动）
-                                [act.name for act in day.activities[:1]]
-                } for day in itinerary
-            ]
+            'daily_overview': daily_overview                                         # 每日概览
         }
 
         return highlights
@@ -421,7 +465,13 @@ class TripSummaryGenerator:
 
         # 根据天气和活动生成打包建议
         if weather_data:
-            avg_temp = sum(w.temperature for w in weather_data) / len(weather_data)
+            # 一次遍历同时累计温度和雨天天数
+            temp_sum = 0.0
+            rainy_days = 0
+            for w in weather_data:
+                temp_sum += w.temperature
+                rainy_days += _classify_weather(w.description)[0]
+            avg_temp = temp_sum / len(weather_data)
 
             if avg_temp < 15:
                 recommendations['packing_essentials'].extend([
@@ -437,7 +487,6 @@ class TripSummaryGenerator:
                 ])
 
             # 检查是否有雨天
-            rainy_days = len([w for w in weather_data if '雨' in w.description or 'rain' in w.description.lower()])
             if rainy_days > 0:
                 recommendations['packing_essentials'].extend([
                     "防水外套或雨伞",
@@ -524,7 +573,7 @@ class TripSummaryGenerator:
         # 根据天气情况添加特定建议
         if weather_data:
             # 计算雨天比例
-            rainy_days = len([w for w in weather_data if '雨' in w.description or 'rain' in w.description.lower()])
+            rainy_days = sum(_classify_weather(w.description)[0] for w in weather_data)
             if rainy_days > len(weather_data) * 0.3:  # 如果雨天超过30%
                 tips.append("为雨天准备室内活动备选方案")
 
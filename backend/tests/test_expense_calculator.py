@@ -0,0 +1,53 @@
+"""
+费用计算模块测试：按预算范围选择用于计算住宿费用的酒店
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+# modules 包使用相对导入（..data、..config），需要从仓库根目录以 backend.modules 导入
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if _REPO_ROOT not in sys.path:
+    sys.path.append(_REPO_ROOT)
+
+expense_calculator = pytest.importorskip("backend.modules.expense_calculator")
+
+
+def _hotel(name: str, price_per_night: float) -> SimpleNamespace:
+    """只包含选择逻辑需要的字段的酒店"""
+    return SimpleNamespace(name=name, price_per_night=price_per_night)
+
+
+# 已按推荐度排序的酒店列表，每晚价格分别落在豪华型、中等预算和经济型区间（人民币）
+RANKED_HOTELS = [
+    _hotel("豪华酒店", 2100),
+    _hotel("中档酒店", 910),
+    _hotel("经济酒店", 350),
+]
+
+
+@pytest.mark.parametrize("budget_range, expected", [
+    ("经济型", "经济酒店"),
+    ("中等预算", "中档酒店"),
+    ("豪华型", "豪华酒店"),
+    # 未知的预算范围按中等预算处理
+    ("unknown", "中档酒店"),
+])
+def test_select_hotel_for_budget_picks_hotel_in_range(budget_range, expected):
+    calculator = expense_calculator.ExpenseCalculator()
+    assert calculator._select_hotel_for_budget(RANKED_HOTELS, budget_range).name == expected
+
+
+def test_select_hotel_for_budget_prefers_first_ranked_match():
+    calculator = expense_calculator.ExpenseCalculator()
+    hotels = [_hotel("中档酒店A", 800), _hotel("中档酒店B", 600)]
+    assert calculator._select_hotel_for_budget(hotels, "中等预算").name == "中档酒店A"
+
+
+def test_select_hotel_for_budget_falls_back_to_first_hotel():
+    calculator = expense_calculator.ExpenseCalculator()
+    hotels = [_hotel("豪华酒店", 2100), _hotel("中档酒店", 910)]
+    assert calculator._select_hotel_for_budget(hotels, "经济型").name == "豪华酒店"
@@ -0,0 +1,42 @@
+"""
+规划结果缓存测试：超出大小上限时的淘汰顺序
+"""
+
+import os
+import sys
+
+# 与 api_server 相同，从 backend 目录导入 utils 包
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _BACKEND_DIR not in sys.path:
+    sys.path.append(_BACKEND_DIR)
+
+from utils.plan_cache import PlanCache
+
+
+def test_put_keeps_new_entry_when_older_entries_have_hits(tmp_path):
+    cache = PlanCache(str(tmp_path / "cache.db"), ttl=3600, max_bytes=10)
+    cache.put("a", b"aaaaa")
+    assert cache.get("a") == b"aaaaa"
+    cache.put("b", b"bbbbb")
+    assert cache.get("b") == b"bbbbb"
+
+    # 新记录的命中次数为0，但刚写入的记录不会被立即淘汰
+    cache.put("c", b"ccccc")
+
+    assert cache.get("c") == b"ccccc"
+    # 命中次数相同的旧记录中，写入最早的被淘汰
+    assert cache.get("a") is None
+    assert cache.get("b") == b"bbbbb"
+
+
+def test_put_evicts_least_used_entry_first(tmp_path):
+    cache = PlanCache(str(tmp_path / "cache.db"), ttl=3600, max_bytes=10)
+    cache.put("a", b"aaaaa")
+    cache.put("b", b"bbbbb")
+    assert cache.get("a") == b"aaaaa"
+
+    cache.put("c", b"ccccc")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"aaaaa"
+    assert cache.get("c") == b"ccccc"
@@ -0,0 +1,129 @@
+"""
+旅行规划结果缓存模块
+
+这个模块把已经完成的旅行规划结果保存到本地SQLite数据库中，包括：
+- 根据旅行需求计算请求指纹
+- 按指纹读取和写入规划结果
+- 过期清理（TTL）和按使用频率淘汰（LFU）
+
+适用于大模型技术初级用户：
+多智能体规划需要多次调用大模型，耗时长、成本高。
+对于目的地、日期、预算、人数和兴趣都相同的请求，
+直接复用之前的规划结果可以省去整个智能体流程。
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+class PlanCache:
+    """
+    基于SQLite的规划结果缓存
+
+    每条缓存记录包含请求指纹、写入时间、命中次数和序列化后的结果。
+    超过有效期的记录视为未命中；总大小超过上限时，
+    优先删除命中次数最少、写入最早的记录（刚写入的记录不参与淘汰）。
+
+    所有方法都是同步的，在异步代码中应通过 asyncio.to_thread 调用。
+    """
+
+    def __init__(self, db_path: str, ttl: float, max_bytes: int):
+        """
+        初始化缓存数据库
+
+        参数：
+        - db_path: SQLite数据库文件路径
+        - ttl: 缓存有效期（秒）
+        - max_bytes: 缓存结果的总大小上限（字节）
+        """
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        # 同一个连接会被线程池中的不同线程使用，用锁保证同一时间只有一个线程访问
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS plan_cache ("
+                " fp TEXT PRIMARY KEY,"
+                " created_at REAL NOT NULL,"
+                " hits INTEGER NOT NULL DEFAULT 0,"
+                " size INTEGER NOT NULL,"
+                " result BLOB NOT NULL)"
+            )
+
+    @staticmethod
+    def fingerprint(request: Dict[str, Any]) -> str:
+        """
+        计算请求指纹
+
+        按键名排序后序列化，保证字段顺序不同的相同请求得到相同的指纹。
+
+        参数：
+        - request: 已规范化的旅行需求字典
+
+        返回：32位十六进制字符串
+        """
+        canonical = json.dumps(request, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+        return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+
+    def get(self, fp: str) -> Optional[bytes]:
+        """
+        读取缓存的规划结果
+
+        参数：
+        - fp: 请求指纹
+
+        返回：未过期时返回序列化的结果，否则返回None
+        """
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT result FROM plan_cache WHERE fp = ? AND created_at >= ?",
+                (fp, time.time() - self.ttl)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE plan_cache SET hits = hits + 1 WHERE fp = ?", (fp,))
+            return row[0]
+
+    def put(self, fp: str, result: bytes):
+        """
+        写入规划结果，并在超出大小上限时淘汰旧记录
+
+        参数：
+        - fp: 请求指纹
+        - result: 序列化后的规划结果
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO plan_cache (fp, created_at, hits, size, result) VALUES (?, ?, 0, ?, ?)",
+                (fp, time.time(), len(result), result)
+            )
+            self._evict(keep_fp=fp)
+
+    def _evict(self, keep_fp: str):
+        """
+        删除过期记录，并按命中次数从少到多淘汰，直到总大小不超过上限
+
+        刚写入的记录命中次数为0，如果参与排序会总是第一个被淘汰，
+        因此 keep_fp 指定的记录不参与淘汰。
+        """
+        self._conn.execute("DELETE FROM plan_cache WHERE created_at < ?", (time.time() - self.ttl,))
+
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM plan_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        evicted = []
+        rows = self._conn.execute(
+            "SELECT fp, size FROM plan_cache WHERE fp != ? ORDER BY hits ASC, created_at ASC",
+            (keep_fp,)
+        ).fetchall()
+        for fp, size in rows:
+            if total <= self.max_bytes:
+                break
+            evicted.append((fp,))
+            total -= size
+        self._conn.executemany("DELETE FROM plan_cache WHERE fp = ?", evicted)